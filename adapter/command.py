@@ -166,7 +166,7 @@ async def sudo_systemctl_service(
 
 
 async def pip(
-    command: str, venv: Optional[str] = None,
+    command: str, venv: Optional[str] = None, python: Optional[str] = None,
     cwd: Optional[str] = None, env: Optional[dict] = None, strip=False,
     stdout_callback: Optional[Callable[[str], None]] = None,
     stderr_callback: Optional[Callable[[str], None]] = None
@@ -180,7 +180,10 @@ async def pip(
     if venv:
         env['VIRTUAL_ENV'] = venv
         env['PATH'] = os.path.join(venv, 'bin') + ':' + os.environ.get('PATH')
-        executable = os.path.join(venv, 'bin', 'pip')
+        # the interpreter decides the target, bin/pip of a copied virtualenv still runs the original one
+        python = os.path.join(venv, 'bin', 'python')
+    if python:
+        executable = python + ' -m pip'
 
     return await shell(
         executable + ' ' + command, cwd=cwd,
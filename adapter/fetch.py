@@ -1,9 +1,25 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, Optional, Tuple, Union
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from http.cookiejar import DefaultCookiePolicy
+import json as jsonlib
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .file import file_digest, readfile, writefile
+from ..paths import paths
+from ..settings import settings
 
 
 class FetchError(Exception):
@@ -14,6 +30,10 @@ class FetchNetworkError(FetchError):
     pass
 
 
+class FetchCircuitOpenError(FetchNetworkError):
+    pass
+
+
 class FetchHTTPError(FetchError):
     def __init__(self, response: requests.Response, *args):
         super().__init__(*args)
@@ -29,6 +49,67 @@ class FetchHTTPServerError(FetchHTTPError):  # 5xx
     pass
 
 
+class HttpClient:
+    MAX_WORKERS = 4
+    POOL_SIZE = 4
+    BREAKER_THRESHOLD = 3
+    BREAKER_COOLDOWN = 5 * 60
+    BACKOFF = 0.5
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self) -> None:
+        self._session: Optional[requests.Session] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._failures: dict[str, int] = {}
+        self._open_until: dict[str, float] = {}
+
+    @property
+    def session(self) -> requests.Session:
+        # connections are kept alive per host, cookies are never carried over between requests
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=self.POOL_SIZE, pool_maxsize=self.MAX_WORKERS)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+        return self._session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # slow responses must not starve the loop's default executor shared with moonraker
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix='qbe-fetch')
+        return self._executor
+
+    def check(self, host: str) -> None:
+        # a host which keeps failing is not contacted until the cooldown passes, other hosts are unaffected
+        if self._open_until.get(host, 0) > time.time():
+            raise FetchCircuitOpenError(f'{host} is unreachable, skipping requests for now')
+
+    def succeeded(self, host: str) -> None:
+        self._failures.pop(host, None)
+        self._open_until.pop(host, None)
+
+    def failed(self, host: str) -> None:
+        self._failures[host] = self._failures.get(host, 0) + 1
+        if self._failures[host] >= self.BREAKER_THRESHOLD:
+            self._open_until[host] = time.time() + self.BREAKER_COOLDOWN
+
+    def backoff(self, attempt: int) -> float:
+        return self.BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+client = HttpClient()
+
+
 async def request(
     method: str,
     url: str,
@@ -44,10 +125,15 @@ async def request(
     proxies: Optional[Dict[str, str]] = None,
     verify: Union[bool, str] = True,
     stream: bool = False,
-    cert: Optional[Union[str, Tuple[str, str]]] = None
+    cert: Optional[Union[str, Tuple[str, str]]] = None,
+    retries: Optional[int] = None
 ):
+    if timeout is None:
+        timeout = (settings.http_connect_timeout, settings.http_read_timeout)
+
     def fetch():
-        return requests.request(
+        start = time.perf_counter()
+        response = client.session.request(
             method, url,
             params=params,
             data=data,
@@ -63,14 +149,46 @@ async def request(
             stream=stream,
             cert=cert,
         )
+        # elapsed only covers the time until the headers arrived, duration includes the body
+        return response, time.perf_counter() - start
+
+    host = urlsplit(url).netloc
+    client.check(host)
+
+    if retries is None:
+        retries = settings.http_retries
 
     loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(None, fetch)
+    error: Optional[FetchError] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(client.backoff(attempt - 1))
+
+        try:
+            response, duration = await loop.run_in_executor(client.executor, fetch)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            logging.debug(f'{method} {url} failed: {e}')
+            error = FetchNetworkError(str(e))
+            continue
+        except requests.RequestException as e:
+            raise FetchError(str(e)) from e
+
+        # callers read the timing of the attempt which produced the response from it
+        response.duration = duration  # type: ignore
+        logging.debug(f'{method} {url} {response.status_code} in {duration * 1000:.0f} ms')
+        if 500 <= response.status_code < 600:
+            error = FetchHTTPServerError(response, response.reason)
+            continue
+
+        client.succeeded(host)
+        break
+    else:
+        client.failed(host)
+        assert error is not None
+        raise error
 
     if response.status_code >= 600:
         raise FetchHTTPError(response, response.reason)
-    if response.status_code >= 500:
-        raise FetchHTTPServerError(response, response.reason)
     if response.status_code >= 400:
         raise FetchHTTPClientError(response, response.reason)
 
@@ -109,3 +227,155 @@ async def get(
         stream=stream,
         cert=cert,
     )
+
+
+async def download(
+        url: str, file: str, headers: Optional[Dict[str, str]] = None,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None
+) -> int:
+    """Streams url into file, a partially downloaded file is resumed with a Range request"""
+    loop = asyncio.get_event_loop()
+    error: Optional[FetchError] = None
+    for attempt in range(settings.http_retries + 1):
+        if attempt:
+            await asyncio.sleep(client.backoff(attempt - 1))
+
+        offset = os.path.getsize(file) if os.path.exists(file) else 0
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers['Range'] = f'bytes={offset}-'
+
+        try:
+            # attempts are counted here only, every one of them resumes from what was written so far
+            response = await request('GET', url, headers=request_headers, stream=True, retries=0)
+        except FetchHTTPClientError as e:
+            if e.response.status_code == 416 and offset:
+                # nothing left past the end of the file
+                return offset
+            raise
+        except FetchCircuitOpenError:
+            raise
+        except (FetchNetworkError, FetchHTTPServerError) as e:
+            error = e
+            continue
+
+        resumed = response.status_code == 206
+        if not resumed:
+            offset = 0
+        total = offset + int(response.headers['Content-Length']) if 'Content-Length' in response.headers else None
+
+        def write():
+            size, reported = offset, -1
+            with response, open(file, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(client.CHUNK_SIZE):
+                    size = size + f.write(chunk)
+                    if progress and total and (size * 10 // total) != reported:
+                        reported = size * 10 // total
+                        loop.call_soon_threadsafe(progress, size, total)
+            return size
+
+        try:
+            size = await loop.run_in_executor(client.executor, write)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            error = FetchNetworkError(str(e))
+            continue
+
+        if total is not None and size != total:
+            error = FetchNetworkError(f'Download of {url} ended at {size} of {total} bytes')
+            continue
+
+        if not resumed and (expected := response.headers.get('Content-MD5')):
+            digest = await loop.run_in_executor(client.executor, file_digest, file, 'md5')
+            if base64.b64encode(bytes.fromhex(digest)).decode('ascii') != expected:
+                os.remove(file)
+                raise FetchError(f'Download of {url} does not match its Content-MD5')
+
+        return size
+
+    assert error is not None
+    raise error
+
+
+class CachedResponse(requests.Response):
+    """Response replayed from the HTTP cache instead of the network"""
+
+
+class HttpCache:
+    HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def __init__(self) -> None:
+        self._limited_until: dict[str, float] = {}
+
+    def _file(self, url: str) -> str:
+        return os.path.join(paths.http_cache, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url: str) -> Optional[dict]:
+        try:
+            return jsonlib.loads(readfile(self._file(url)))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, response: requests.Response) -> None:
+        if not os.access(paths.cache, os.W_OK):
+            return
+
+        os.makedirs(paths.http_cache, exist_ok=True)
+        writefile(self._file(url), jsonlib.dumps({
+            'url': url,
+            'time': time.time(),
+            'headers': {k: response.headers[k] for k in self.HEADERS if k in response.headers},
+            'content': base64.b64encode(response.content).decode('ascii'),
+        }))
+
+    def limited(self, host: str) -> bool:
+        return self._limited_until.get(host, 0) > time.time()
+
+    def watch(self, host: str, response: requests.Response) -> None:
+        # github announces the exhausted limit and when it resets, other hosts may only send Retry-After
+        headers = response.headers
+        if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset', '').isdigit():
+            self._limited_until[host] = float(headers['X-RateLimit-Reset'])
+        elif response.status_code in (403, 429) and headers.get('Retry-After', '').isdigit():
+            self._limited_until[host] = time.time() + float(headers['Retry-After'])
+
+    @staticmethod
+    def response(entry: dict) -> CachedResponse:
+        response = CachedResponse()
+        response.status_code = 200
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = base64.b64decode(entry['content'])
+        return response
+
+
+http_cache = HttpCache()
+
+
+async def get_cached(url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """GET revalidated with the stored ETag/Last-Modified, stale data is served while the host is rate limited"""
+    host = urlsplit(url).netloc
+    entry = http_cache.load(url)
+    if entry and http_cache.limited(host):
+        return http_cache.response(entry)
+
+    headers = dict(headers or {})
+    if entry and (etag := entry['headers'].get('ETag')):
+        headers['If-None-Match'] = etag
+    if entry and (last_modified := entry['headers'].get('Last-Modified')):
+        headers['If-Modified-Since'] = last_modified
+
+    try:
+        response = await get(url, headers=headers)
+    except FetchHTTPClientError as e:
+        http_cache.watch(host, e.response)
+        if entry and http_cache.limited(host):
+            return http_cache.response(entry)
+        raise
+
+    http_cache.watch(host, response)
+    if response.status_code == 304 and entry:
+        return http_cache.response(entry)
+
+    if response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+        http_cache.store(url, response)
+    return response
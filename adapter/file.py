@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import ctypes
 import fcntl
+import hashlib
+import os
+import shutil
 
 
 class FileLock:
@@ -11,7 +15,7 @@ class FileLock:
 
     def lock(self):
         if not self._fd:
-            self._fd = open(self._path)
+            self._fd = open(self._path, 'a')
             try:
                 fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
             except IOError:
@@ -39,3 +43,43 @@ def writefile(path: str, data: str) -> int:
 def readfile(path: str) -> str:
     with open(path, 'r', encoding='utf-8') as stream:
         return stream.read()
+
+
+def file_digest(path: str, algorithm: str = 'sha256') -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def exchange(first: str, second: str) -> bool:
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+
+    return renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) == 0
+
+
+def replace_dir(new: str, path: str) -> None:
+    """Moves directory new into path, readers see either the old or the new tree, never a mix"""
+    if not os.path.exists(path):
+        os.rename(new, path)
+        return
+
+    shutil.copystat(path, new)
+    if exchange(new, path):
+        shutil.rmtree(new)
+        return
+
+    # without renameat2 path is missing for the moment between two renames
+    old = path + '.qbe-old'
+    shutil.rmtree(old, ignore_errors=True)
+    os.rename(path, old)
+    os.rename(new, path)
+    shutil.rmtree(old)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Optional
+
+from .file import file_digest, readfile, writefile
+from ..paths import paths
+
+
+class Fingerprints:
+    """Content digests of files, a file is read again only when its inode, size or mtime changes"""
+
+    def __init__(self) -> None:
+        self._entries: Optional[dict[str, list]] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(paths.cache, 'fingerprints.json')
+
+    @property
+    def entries(self) -> dict[str, list]:
+        if self._entries is None:
+            try:
+                data = json.loads(readfile(self.path))
+            except (OSError, ValueError):
+                data = {}
+            # [inode, size, mtime_ns, digest] per path
+            self._entries = {k: v for k, v in data.items() if isinstance(v, list) and len(v) == 4}
+        return self._entries
+
+    @staticmethod
+    def stat(file: str) -> Optional[list[int]]:
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return None
+        return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+    @classmethod
+    def signature(cls, files: list[str], extra: str = '') -> dict:
+        stats: list[list] = []
+        for file in files:
+            stats.append([file, *stat] if (stat := cls.stat(file)) else [file, None])
+        return {'extra': extra, 'files': stats}
+
+    async def digests(self, files: list[str]) -> dict[str, Optional[str]]:
+        """Digest of each file, None for missing ones, only changed files are hashed in a worker thread"""
+        result: dict[str, Optional[str]] = {}
+        changed: dict[str, list[int]] = {}
+        for file in files:
+            if (stat := self.stat(file)) is None:
+                result[file] = None
+            elif (entry := self.entries.get(file)) and entry[:3] == stat:
+                result[file] = entry[3]
+            else:
+                changed[file] = stat
+
+        if changed:
+            def compute():
+                digests = {}
+                for file in changed:
+                    try:
+                        digests[file] = file_digest(file)
+                    except FileNotFoundError:
+                        digests[file] = None
+                return digests
+
+            for file, digest in (await asyncio.get_event_loop().run_in_executor(None, compute)).items():
+                if digest is not None:
+                    self.entries[file] = [*changed[file], digest]
+                result[file] = digest
+            self.save()
+
+        return result
+
+    def save(self) -> None:
+        if not os.access(paths.cache, os.W_OK):
+            return
+
+        writefile(self.path + '.tmp', json.dumps(self.entries))
+        os.replace(self.path + '.tmp', self.path)
+
+
+fingerprints = Fingerprints()
+
+__all__ = ['fingerprints']
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import time
+
+import click
+from tabulate import tabulate
+
+from ...adapter.command import shell, CommandError
+from ...cli import async_command, warning, bold
+from ...paths import paths
+from ...updatable.data_source.git import GitDataSource
+from ...updatable.data_source.git_backend import AVAILABLE_GIT_BACKENDS, GitBackend
+
+
+async def refresh_queries(backend: GitBackend, repo: str, branch: str) -> None:
+    head, upstream = await backend.resolve(repo, 'HEAD', f'origin/{branch}')
+    try:
+        since, = await backend.resolve(repo, f'{upstream}~{GitDataSource.MAX_COMMITS}')
+    except CommandError:
+        since = head
+
+    await backend.describe(repo, head)
+    await backend.describe(repo, upstream)
+    await backend.count(repo, since, upstream)
+    await backend.log(repo, since, upstream, GitDataSource.MAX_COMMITS)
+
+
+@async_command(short_help='Compare refresh latency of git backends')
+@click.argument('repos', nargs=-1)
+@click.option('--rounds', '-r', default=10, type=click.IntRange(min=1))
+async def git_benchmark(repos: tuple[str], rounds: int):
+    if not repos:
+        repos = tuple(
+            entry.path for entry in sorted(os.scandir(paths.packages), key=lambda e: e.name)
+            if os.path.isdir(os.path.join(entry.path, '.git'))
+        )
+
+    backends = {name: cls() for name, cls in AVAILABLE_GIT_BACKENDS.items() if cls.available()}
+    for name, cls in AVAILABLE_GIT_BACKENDS.items():
+        if not cls.available():
+            print(warning(f'Backend {name} not available, skipping'))
+
+    table = [['Repository', *(bold(name) for name in backends)]]
+    for repo in repos:
+        branch = await shell('git rev-parse --abbrev-ref HEAD', cwd=repo, strip=True)
+        row = [os.path.basename(repo)]
+        try:
+            await refresh_queries(backends['cli'], repo, branch)
+        except CommandError:
+            print(warning(f'{repo} has no origin/{branch}, skipping'))
+            continue
+
+        for backend in backends.values():
+            await refresh_queries(backend, repo, branch)  # warm up
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                await refresh_queries(backend, repo, branch)
+            row.append(f'{(time.perf_counter() - start) / rounds * 1000:.1f} ms')
+
+        table.append(row)
+
+    print(tabulate(table, headers='firstrow', tablefmt='rounded_grid'))
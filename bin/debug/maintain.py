@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import os
+
+from tabulate import tabulate
+
+from ...cli import async_command, bold, format_size, warning
+from ...cli.lockfile import pass_lockfile
+from ...lockfile import LockFile
+from ...updatable.data_source.git_maintenance import git_maintenance
+
+
+@async_command(short_help='Repack and clean up managed git repositories')
+@pass_lockfile
+async def maintain(lockfile: LockFile):
+    lockfile.lock()
+    try:
+        reports = await git_maintenance.run()
+    finally:
+        lockfile.unlock()
+
+    if not reports:
+        print(warning('No repositories found'))
+        return
+
+    table = [[bold('Repository'), bold('Before'), bold('After'), bold('Time')]]
+    for report in reports:
+        table.append([
+            os.path.basename(report.repo),
+            format_size(report.size_before),
+            format_size(report.size_after),
+            f'{report.duration:.1f} s'
+        ])
+
+    print(tabulate(table, headers='firstrow', tablefmt='rounded_grid', colalign=('left', 'right', 'right', 'right')))
@@ -14,31 +14,30 @@ from ..mcu import MCU
 from ..package import build as build_package
 from ..package.qbe import QBE as QBEPackage
 from ..qbefile import QBEFile
+from ..updatable import Updatable
+from ..updatable.pool import WorkerPool
 
 
 @async_command(short_help='Refresh remotes')
 @click.argument('name', required=False)
 @click.option('--mcus-only', '-m', default=False, is_flag=True)
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='Number of packages refreshed at once')
 @pass_lockfile
 @pass_qbefile
-async def refresh(qbefile: QBEFile, lockfile: LockFile, name: Optional[str], mcus_only: bool) -> None:
-    with CliProgress(lockfile) as progress:
+async def refresh(qbefile: QBEFile, lockfile: LockFile, name: Optional[str], mcus_only: bool, jobs: int) -> None:
+    with CliProgress(lockfile, autosave=False) as progress:
+        pool = WorkerPool(jobs)
+
         if not mcus_only:
             for lock, pkg in packages(qbefile, lockfile):
                 if name is not None and pkg.name != name:
                     continue
 
                 if lock.status.unfinished():
-                    print(progress.formatter.format_updatable(pkg) + ' ' + warning('update unfinished, skipping'))
+                    print(progress.formatter.format_updatable(pkg) + ' ' + warning('update unfinished, skipping (run update to resume)'))
                     continue
 
-                with progress.updatable(pkg) as p:
-                    await pkg.refresh(progress=p)
-
-                    if lock.remote_version != lock.current_version.replace('-dirty', ''):
-                        p.log(fine(f'current version {lock.current_version}, update available to {lock.remote_version}'))
-                    else:
-                        p.log(comment('up to date'))
+                pool.submit(refresh_updatable(progress, pkg, buffered=jobs > 1), key=pkg.source.path)
 
         if not name:
             for mcu_config in qbefile.mcus:
@@ -49,13 +48,21 @@ async def refresh(qbefile: QBEFile, lockfile: LockFile, name: Optional[str], mcu
                     print(progress.formatter.format_updatable(mcu) + ' ' + warning('update unfinished, skipping'))
                     continue
 
-                with progress.updatable(mcu) as p:
-                    await mcu.refresh(progress=p)
+                pool.submit(refresh_updatable(progress, mcu, buffered=jobs > 1), key=mcu.source.path)
+
+        await pool.join()
+
+
+async def refresh_updatable(progress: CliProgress, updatable: Updatable, buffered: bool = False) -> None:
+    with progress.updatable(updatable, buffered=buffered) as p:
+        await updatable.refresh(progress=p)
 
-                    if lock.remote_version != lock.current_version:
-                        p.log(fine(f'current version {lock.current_version}, update available to {lock.remote_version}'))
-                    else:
-                        p.log(comment('up to date'))
+        lock = updatable.lock
+        current_version = lock.current_version if isinstance(updatable, MCU) else lock.current_version.replace('-dirty', '')
+        if lock.remote_version != current_version:
+            p.log(fine(f'current version {lock.current_version}, update available to {lock.remote_version}'))
+        else:
+            p.log(comment('up to date'))
 
 
 def packages(qbefile: QBEFile, lockfile: LockFile):
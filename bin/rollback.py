@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import click
+
+from ..cli import async_command, warning
+from ..cli.lockfile import pass_lockfile
+from ..cli.progress import CliProgress
+from ..cli.qbefile import pass_qbefile
+from ..lockfile import LockFile
+from ..package import build as build_package
+from ..qbefile import QBEFile
+from ..trigger.service_reload import ServiceReloadTrigger
+
+
+@async_command(short_help='Switch back to the previous release (blue-green deploy)')
+@click.argument('name')
+@pass_lockfile
+@pass_qbefile
+async def rollback(qbefile: QBEFile, lockfile: LockFile, name: str) -> None:
+    with CliProgress(lockfile) as progress:
+        for dep in qbefile.requires:
+            pkg = build_package(dep, lockfile.requires.always(dep.identifier))
+            if pkg.name != name:
+                continue
+
+            with progress.updatable(pkg) as p:
+                await pkg.rollback(progress=p)
+
+            for trig, updatable in ServiceReloadTrigger.dedupe(progress.triggers):
+                await trig.handle(progress, updatable)
+            return
+
+        print(warning(f'Package {name} not found'))
@@ -1,29 +1,39 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Optional
 
 import click
 
-from ..cli import async_command
+from ..cli import async_command, warning, format_size
 from ..cli.lockfile import pass_lockfile
 from ..cli.progress import CliProgress
 from ..cli.qbefile import pass_qbefile
 from ..lockfile import LockFile
-from ..package import build as build_package
+from ..package import build as build_package, Package
+from ..package.graph import dependency_graph, ordered
 from ..qbefile import QBEFile
 from ..qbefile.dependency import from_lock
 from ..trigger.service_reload import ServiceReloadTrigger
+from ..updatable.pool import WorkerPool, DependencyFailedError
 
 
 @async_command(short_help='Update dependencies')
 @click.argument('name', required=False)
 @click.option('--remove-only', '-r', default=False, is_flag=True)
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help='Number of packages updated at once')
+@click.option('--no-prefetch', default=False, is_flag=True, help='Download sources while applying instead of upfront')
+@click.option('--force', '-f', default=False, is_flag=True, help='Apply providers even when their inputs did not change')
 @pass_lockfile
 @pass_qbefile
-async def update(qbefile: QBEFile, lockfile: LockFile, name: Optional[str], remove_only: bool) -> None:
+async def update(
+        qbefile: QBEFile, lockfile: LockFile, name: Optional[str], remove_only: bool, jobs: int, no_prefetch: bool,
+        force: bool
+) -> None:
     with CliProgress(lockfile) as progress:
         processed_identifiers = set()
         try:
+            pkgs = []
             for dep in qbefile.requires:
                 processed_identifiers.add(dep.identifier)
                 if remove_only:
@@ -33,8 +43,32 @@ async def update(qbefile: QBEFile, lockfile: LockFile, name: Optional[str], remo
                 if name is not None and pkg.name != name:
                     continue
 
-                with progress.updatable(pkg) as p:
-                    await pkg.update(progress=p)
+                pkgs.append(pkg)
+
+            pool = WorkerPool(jobs)
+            if not no_prefetch:
+                for pkg in pkgs:
+                    pool.submit(prefetch_package(progress, pkg), key=pkg.source.path)
+                await pool.join()
+
+                if progress.stats_prefetched:
+                    print(f'Prefetched {format_size(progress.stats_prefetched)}')
+
+            tasks: dict[Package, asyncio.Future] = {}
+            graph = dependency_graph(pkgs)
+            for pkg in ordered(graph):
+                tasks[pkg] = pool.submit(
+                    update_package(progress, pkg, force=force),
+                    key=pkg.source.path,
+                    after=[tasks[dependency] for dependency in graph[pkg]]
+                )
+
+            try:
+                await pool.join()
+            finally:
+                for pkg, task in tasks.items():
+                    if task.done() and not task.cancelled() and isinstance(task.exception(), DependencyFailedError):
+                        print(progress.formatter.format_updatable(pkg) + ' ' + warning('dependency update failed, skipping'))
 
             for identifier, lock in lockfile.requires.difference(processed_identifiers).items():
                 pkg = build_package(from_lock(identifier, lock), lock)
@@ -74,6 +108,16 @@ async def update(qbefile: QBEFile, lockfile: LockFile, name: Optional[str], remo
             ]))
 
 
+async def prefetch_package(progress: CliProgress, pkg: Package) -> None:
+    with progress.prefetching(pkg) as p:
+        await pkg.prefetch(progress=p)
+
+
+async def update_package(progress: CliProgress, pkg: Package, force: bool = False) -> None:
+    with progress.updatable(pkg) as p:
+        await pkg.update(progress=p, force=force)
+
+
 def cs(message: str, condition: bool, true_style: dict, false_style: dict) -> str:
     if condition:
         if not true_style:
@@ -65,3 +65,11 @@ def comment(message: str):
 
 def bold(message: str):
     return click.style(message, bold=True)
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size = size / 1024
+    return f'{size:.1f} GiB'
@@ -10,8 +10,8 @@ from ..updatable.progress import ProgressRoot
 
 
 class CliProgress(ProgressRoot):
-    def __init__(self, lockfile: LockFile):
-        super().__init__(lockfile, Formatter())
+    def __init__(self, lockfile: LockFile, autosave: bool = True):
+        super().__init__(lockfile, Formatter(), autosave=autosave)
 
     def log(self, message: str) -> None:
         print(message)
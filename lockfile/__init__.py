@@ -18,7 +18,8 @@ MCUsDict = LockDict[str, MCULock]
 class LockFile:
     def __init__(self, path: str, qbe: QBELock, requires: RequiresDict, mcus: MCUsDict):
         self._path = path
-        self._lock = FileLock(path)
+        # save replaces the lockfile, the flock has to be held on a file which stays in place
+        self._lock = FileLock(path + '.flock')
 
         self._qbe = qbe
         self._requires = requires
@@ -41,11 +42,13 @@ class LockFile:
         return self._mcus
 
     def save(self):
-        writefile(self._path, dump_yaml({
+        # replaced in one rename, a power loss leaves either the previous or the new lockfile
+        writefile(self._path + '.tmp', dump_yaml({
             'mcus': self._mcus.to_dict(),
             'qbe': encode(self._qbe),
             'requires': self._requires.to_dict()
         }, None, default_flow_style=False))
+        os.replace(self._path + '.tmp', self._path)
 
     @classmethod
     def _identify_requires_dict(cls, requires: dict) -> dict[Identifier, dict]:
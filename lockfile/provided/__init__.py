@@ -26,7 +26,7 @@ class Provided(CustomEncode):
         return self._data[provider.DISCRIMINATOR]
 
     def has(self, provider: Provider) -> bool:
-        return provider.DISCRIMINATOR in self._data
+        return provider.DISCRIMINATOR in self._data and bool(self._data[provider.DISCRIMINATOR].all)
 
     @classmethod
     def decode(cls, data: dict):
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Iterable, Optional, Union
 
 from .entry import Entry
 from ...adapter.dataclass import CustomEncode, encode
@@ -10,6 +10,7 @@ class ProviderProvided(CustomEncode):
     def __init__(self) -> None:
         self._store: set[Entry] = set()
         self._current: set[Entry] = set()
+        self.fingerprint: Optional[str] = None
 
     @property
     def all(self) -> set[Entry]:
@@ -20,6 +21,8 @@ class ProviderProvided(CustomEncode):
         return self._store.difference(self._current)
 
     def custom_encode(self):
+        if self.fingerprint:
+            return {'fingerprint': self.fingerprint, 'entries': list(map(encode, self._store))}
         return list(map(encode, self._store))
 
     def notice(self, path: tuple[str, ...], input=None, output=None, **kw) -> None:
@@ -35,8 +38,11 @@ class ProviderProvided(CustomEncode):
             pass
 
     @classmethod
-    def decode(cls, data: Iterable[dict]) -> ProviderProvided:
+    def decode(cls, data: Union[dict, Iterable[dict]]) -> ProviderProvided:
         result = cls()
+        if isinstance(data, dict):
+            result.fingerprint = data.get('fingerprint')
+            data = data.get('entries', [])
 
         for item in data:
             result._store.add(Entry.decode(item))
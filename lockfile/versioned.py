@@ -5,6 +5,7 @@ from typing import Optional
 
 from .provided import Provided
 from ..adapter.dataclass import UniversalDecoder, field
+from ..trigger import build as build_trigger, Trigger
 from ..updatable.data_source.git import TaggedCommit
 from ..updatable.progress.package_status import PackageStatus
 
@@ -15,8 +16,12 @@ class Versioned(UniversalDecoder):
     current_version: str = '?'
     remote_version: str = '?'
     commits_behind: list[TaggedCommit] = field(default_factory=list, decoder=lambda v: [TaggedCommit(**c) for c in v])
+    source_tips: Optional[str] = field(default=None, omitempty=True)
+    remote_tip: Optional[str] = field(default=None, omitempty=True)
     last_error: Optional[str] = None
     status: PackageStatus = field(default=PackageStatus.UNKNOWN)
+    checkpoints: list[str] = field(default_factory=list, omitempty=True)
+    triggers: list[Trigger] = field(default_factory=list, omitempty=True, decoder=lambda v: [build_trigger(t) for t in v])
     provided: Provided = field(default_factory=Provided)
 
     def update(self, data: dict) -> None:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Optional
 
 from . import data_source
 from .base import ManifestDataSource
@@ -12,10 +13,14 @@ from ...adapter.dataclass import field
 class GitDataSource(ManifestDataSource):
     url: str = field(name='git')
     branch: str = field(default='master', omitempty=True)
+    depth: Optional[int] = field(default=None, omitempty=True)
+    filter: Optional[str] = field(default=None, omitempty=True)
 
     @classmethod
     def decode(cls, data: dict) -> ManifestDataSource:
         return cls(
             url=data.get('git'),
-            branch=data.get('branch', 'master')
+            branch=data.get('branch', 'master'),
+            depth=data.get('depth', None),
+            filter=data.get('filter', None)
         )
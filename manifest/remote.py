@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import hashlib
+import os
+import tarfile
+import tempfile
+import time
+from typing import Optional
+
+from ..adapter.command import shell, CommandError
+from ..adapter.file import readfile, writefile
+from ..adapter.yaml import load
+from ..paths import paths
+from ..qbefile.utils import CONFIG_FILE_NAMES
+
+
+class RemoteManifests:
+    TTL = 60
+
+    def __init__(self) -> None:
+        self._loaded: dict[tuple[str, str], tuple[float, dict]] = {}
+        self._loading: dict[tuple[str, str], asyncio.Future] = {}
+
+    @staticmethod
+    def _prefix(url: str, branch: str) -> str:
+        digest = hashlib.sha1(f'{url}#{branch}'.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(paths.cache, 'manifests', digest)
+
+    def cached(self, url: str, branch: str) -> Optional[dict]:
+        if (url, branch) in self._loaded:
+            return self._loaded[(url, branch)][1]
+
+        # the newest manifest seen for this branch, good enough until the next refresh checks the remote
+        files = sorted(glob.glob(self._prefix(url, branch) + '-*.yml'), key=os.path.getmtime)
+        if files:
+            return self.remember(url, branch, load(readfile(files[-1])), loaded_at=0)
+
+        return None
+
+    def remember(self, url: str, branch: str, manifest: dict, loaded_at: Optional[float] = None) -> dict:
+        self._loaded[(url, branch)] = (time.time() if loaded_at is None else loaded_at, manifest)
+        return manifest
+
+    async def load(self, url: str, branch: str) -> dict:
+        key = (url, branch)
+        if key in self._loaded and time.time() - self._loaded[key][0] < self.TTL:
+            return self._loaded[key][1]
+
+        if key not in self._loading:
+            self._loading[key] = asyncio.ensure_future(self._load(url, branch))
+
+        try:
+            return await asyncio.shield(self._loading[key])
+        finally:
+            self._loading.pop(key, None)
+
+    async def _load(self, url: str, branch: str) -> dict:
+        sha = (await shell(f'git ls-remote {url} refs/heads/{branch}', strip=True)).split('\t', maxsplit=1)[0]
+        cache_file = f'{self._prefix(url, branch)}-{sha}.yml'
+
+        if sha and os.path.exists(cache_file):
+            return self.remember(url, branch, load(readfile(cache_file)))
+
+        content = await self._fetch(url, branch)
+        if sha and os.access(paths.cache, os.W_OK):
+            for stale in glob.glob(self._prefix(url, branch) + '-*.yml'):
+                os.remove(stale)
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            writefile(cache_file, content)
+
+        return self.remember(url, branch, load(content))
+
+    async def _fetch(self, url: str, branch: str) -> str:
+        with tempfile.TemporaryDirectory() as tmp:
+            for file_name in CONFIG_FILE_NAMES:
+                archive = os.path.join(tmp, 'manifest.tar')
+                try:
+                    await shell(f'git archive --remote={url} --output={archive} {branch} {file_name}')
+                    with tarfile.open(archive) as tar:
+                        if member := tar.extractfile(file_name):
+                            return member.read().decode()
+                except (CommandError, KeyError, tarfile.TarError):
+                    pass
+
+            # most hosts (github included) do not serve git archive, a blobless depth 1 fetch is the next best thing
+            await shell('git init -q', cwd=tmp)
+            await shell(f'git fetch -q --depth=1 --filter=blob:none {url} {branch}', cwd=tmp)
+            for file_name in CONFIG_FILE_NAMES:
+                try:
+                    await shell(f'git cat-file blob FETCH_HEAD:{file_name} > manifest.yml', cwd=tmp)
+                    return readfile(os.path.join(tmp, 'manifest.yml'))
+                except CommandError:
+                    pass
+
+        raise ValueError("None of the files exist in the repository.")
+
+
+remote_manifests = RemoteManifests()
+
+__all__ = ['remote_manifests']
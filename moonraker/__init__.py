@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from asyncio import Handle
+import logging
 import os.path
 from types import MethodType
 from typing import TYPE_CHECKING, Optional
@@ -12,6 +13,7 @@ from .updaters_wrapper import UpdatersWrapper
 from .utils import is_mcu_key
 from .watcher import Watcher
 from .file_manager import hook as hook_file_manager
+from ..adapter.fetch import client as http_client
 from ..lockfile import LockFile
 from ..lockfile.utils import for_qbe_file
 from ..mcu import MCU
@@ -21,6 +23,8 @@ from ..paths import paths
 from ..qbefile import load as load_qbefile
 from ..qbefile.dependency import from_lock
 from ..qbefile.utils import find_in
+from ..updatable.data_source.dirty_tracker import dirty_tracker
+from ..updatable.data_source.git_maintenance import git_maintenance
 
 if TYPE_CHECKING:
     from confighelper import ConfigHelper
@@ -31,13 +35,20 @@ if TYPE_CHECKING:
 
 
 class QBE:
+    MAINTENANCE_INTERVAL = 24 * 60 * 60
+    MAINTENANCE_RETRY = 15 * 60
+
     def __init__(self, config: ConfigHelper) -> None:
         self._debouncer: Optional[Handle] = None
         self.server = config.get_server()
+        self._maintenance_timer = self.server.event_loop.register_timer(self._maintain)
 
         # Register handlers
         self.server.register_event_handler('server:klippy_ready', self._klippy_ready)
 
+        # Working trees are watched, so refreshes only run git status checks after changes
+        dirty_tracker.enable()
+
         # Load config
         qbefile_path = config.get('qbefile', None) or find_in(paths.config_root)
 
@@ -91,9 +102,9 @@ class QBE:
             self.server.add_warning(f'Failed reloading qbe/lock file\n{e}')
         else:
             for dep in updates.added.packages:
-                updater = self.uw.add_updater(
-                    build_package(dep, self.lockfile.requires.always(dep.identifier))
-                )
+                package = build_package(dep, self.lockfile.requires.always(dep.identifier))
+                await package.load_manifest()
+                updater = self.uw.add_updater(package)
                 await updater.initialize()
                 await updater.refresh()
 
@@ -137,11 +148,42 @@ class QBE:
             self.uw.notify_update_refreshed()
 
     async def component_init(self) -> None:
-        pass
+        self._maintenance_timer.start(delay=self.MAINTENANCE_RETRY)
 
     async def close(self) -> None:
+        self._maintenance_timer.stop()
         self.qbe_watch.close()
         self.lock_watch.close()
+        http_client.close()
+
+    def _is_idle(self) -> bool:
+        kconn = self.server.lookup_component('klippy_connection')
+        update_manager: UpdateManager = self.server.lookup_component('update_manager')
+        return not kconn.is_printing() and not update_manager.cmd_request_lock.locked()
+
+    async def _maintain(self, eventtime: float) -> float:
+        if not self._is_idle():
+            return eventtime + self.MAINTENANCE_RETRY
+
+        try:
+            self.lockfile.lock()
+        except RuntimeError:
+            return eventtime + self.MAINTENANCE_RETRY
+
+        try:
+            # stops between repositories as soon as a print or an update starts
+            reports = await git_maintenance.run(should_continue=self._is_idle)
+            for report in reports:
+                logging.info(
+                    f'QBE :: maintained {report.repo} in {report.duration:.1f}s, '
+                    f'{report.size_before} -> {report.size_after} bytes'
+                )
+        except Exception as e:
+            logging.exception(f'QBE :: git maintenance failed: {e}')
+        finally:
+            self.lockfile.unlock()
+
+        return eventtime + self.MAINTENANCE_INTERVAL
 
     async def _klippy_ready(self) -> None:
         kapis: APIComp = self.server.lookup_component('klippy_apis')
@@ -32,7 +32,12 @@ class BlindProxy(Generic[Proxied], Proxied if TYPE_CHECKING else object):
     def hook_lock(self, original: Callable[[], None]) -> None:
         watcher: Watcher = super().__getattribute__('_watcher')
         watcher.pause()
-        return original()
+        try:
+            return original()
+        except Exception:
+            # a lock held elsewhere leaves nothing to unlock, the watcher is resumed here instead
+            watcher.resume()
+            raise
 
     def hook_unlock(self, original: Callable[[], None]) -> None:
         watcher: Watcher = super().__getattribute__('_watcher')
@@ -46,35 +46,36 @@ class QBEDeployer(BaseDeploy):
         await self._updatable.refresh()
         self._updaters_wrapper.lockfile.save()
 
-    async def update(self) -> bool:
+    async def update(self, force: bool = False) -> bool:
         self.cmd_helper.notify_update_response(f'{self.TEXT_PROCESS_STARTING} {self.name}...')
 
         with MoonrakerProgress(self._updaters_wrapper.lockfile, logger=self.qbe_log) as progress:
-            await self._execute(progress)
-
-            for trig, updatable in progress.triggers:
-                if isinstance(trig, GCodeTrigger):
-                    try:
-                        await self._kapis.run_gcode(trig.gcode)
-                    except:
-                        self._server.add_warning(f'Could not run G-Code, you may want to run it manually: {trig.gcode}')
-                elif isinstance(trig, ServiceReloadTrigger) and self._is_moonraker_service_trigger(trig):
-                    if trig.daemon_reload:
-                        await sudo_systemctl_daemon_reload()
-
-                    self.notify_status('Restarting moonraker...')
-                    self._machine.restart_moonraker_service()
-                else:
-                    await trig.handle(progress, updatable)
-
+            await self._execute(progress, force=force)
+            await self._handle_triggers(progress)
             await self._on_complete()
         return True
 
     async def recover(self, hard: bool = False, force_dep_update: bool = False) -> None:
-        self.notify_status("Recovery not supported", is_complete=True)
+        if not self._updatable.lock.status.unfinished():
+            self.notify_status("Nothing to recover", is_complete=True)
+            return
+
+        # completed steps are kept unless a hard recovery was requested, which applies every provider again
+        if hard:
+            self._updatable.lock.checkpoints = []
+
+        self.notify_status(f"Resuming update of {self.name}...")
+        await self.update(force=hard)
 
     async def rollback(self) -> bool:
-        self.notify_status("Rollback not supported", is_complete=True)
+        with MoonrakerProgress(self._updaters_wrapper.lockfile, logger=self.qbe_log) as progress:
+            with progress.updatable(self._updatable) as p:
+                if not await self._updatable.rollback(p):
+                    self.notify_status("Rollback not available", is_complete=True)
+                    return True
+
+            await self._handle_triggers(progress)
+            self.notify_status('Rollback Finished!', is_complete=True)
         return True
 
     def get_update_status(self) -> Dict[str, Any]:
@@ -155,10 +156,29 @@ class QBEDeployer(BaseDeploy):
     def _is_moonraker_service_trigger(trigger: ServiceReloadTrigger) -> bool:
         return trigger.service.lower() in ('moonraker', 'moonraker.service')
 
-    async def _execute(self, progress):
+    async def _handle_triggers(self, progress: MoonrakerProgress) -> None:
+        for trig, updatable in progress.triggers:
+            if isinstance(trig, GCodeTrigger):
+                try:
+                    await self._kapis.run_gcode(trig.gcode)
+                except:
+                    self._server.add_warning(f'Could not run G-Code, you may want to run it manually: {trig.gcode}')
+            elif isinstance(trig, ServiceReloadTrigger) and self._is_moonraker_service_trigger(trig):
+                if trig.daemon_reload:
+                    await sudo_systemctl_daemon_reload()
+
+                self.notify_status('Restarting moonraker...')
+                self._machine.restart_moonraker_service()
+            else:
+                await trig.handle(progress, updatable)
+
+    async def _execute(self, progress, force: bool = False):
         try:
+            with progress.prefetching(self._updatable) as p:
+                await self._updatable.prefetch(p)
+
             with progress.updatable(self._updatable) as p:
-                await self._updatable.update(p)
+                await self._updatable.update(p, force=force)
         except Exception as e:
             raise self.log_exc(f'Update failed, {e}', False)
 
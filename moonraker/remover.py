@@ -19,7 +19,7 @@ class QBERemover(QBEDeployer):
     def package(self) -> Package:
         return self._updatable
 
-    async def _execute(self, progress):
+    async def _execute(self, progress, force: bool = False):
         try:
             with progress.updatable(self._updatable) as p:
                 await self._updatable.remove(p)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import abstractmethod
+import asyncio
 from dataclasses import fields
 from functools import cached_property
 import hashlib
@@ -10,20 +11,26 @@ from typing import TYPE_CHECKING, Optional
 
 from ..adapter.dataclass import encode
 from ..adapter.file import readfile
+from ..adapter.fingerprint import fingerprints
 from ..adapter.yaml import load, dump
 from ..manifest import Manifest
+from .graph import provider_graph, ordered
 from ..paths import paths
 from ..provider import providers as all_providers
 from ..qbefile.utils import find_in
 from ..updatable import Updatable
 from ..updatable.data_source import for_local_path_and_manifest, DataSource
 from ..updatable.data_source.internal import InternalDataSource
+from ..updatable.data_source.releases import Releases
+from ..updatable.pool import WorkerPool
 
 if TYPE_CHECKING:
     from updatable.progress import UpdatableProgress
+    from ..updatable.progress.prefetch import PrefetchProgress
     from ..qbefile.dependency import Dependency
     from ..updatable.identifier import Identifier
     from ..lockfile.dependency import DependencyLock
+    from ..provider.base import Provider
 
 
 class Package(Updatable):
@@ -78,14 +85,26 @@ class Package(Updatable):
     def options_dirty(self) -> bool:
         return self._dependency.options != self.lock.current_options
 
+    @property
+    def source_dirty(self) -> bool:
+        current = self.lock.current_version.removesuffix('-dirty')
+        return current == '?' or current != self.lock.remote_version
+
     @property
     def recipie_dirty(self) -> bool:
         return self.lock.recipie_hash_installed != self.lock.recipie_hash_current
 
+    async def load_manifest(self) -> None:
+        pass
+
     async def refresh(self, **kw):
         await super().refresh(**kw)
         self.lock.recipie_hash_current = await self._hash_recipe()
 
+        if self.recipie_dirty and self.lock.recipie_hash_installed and os.path.exists(self.source.path):
+            if self.lock.recipie_hash_installed == await self._legacy_recipe_hash():
+                self.lock.recipie_hash_installed = self.lock.recipie_hash_current
+
     @cached_property
     def providers(self):
         providers = []
@@ -104,13 +123,79 @@ class Package(Updatable):
 
         return providers
 
-    async def update(self, progress: UpdatableProgress, **kw) -> None:
-        await super().update(progress, **kw)  # pull
+    @property
+    def targets(self) -> list[str]:
+        return [target for provider in self.providers for target in provider.targets]
+
+    async def prefetch(self, progress: PrefetchProgress, **kw) -> None:
+        await super().prefetch(progress, **kw)
+
+        # wheels only change with the source or the recipe, unchanged packages do not query the index
+        if not self.source_dirty and not self.recipie_dirty:
+            return
 
         for provider in self.providers:
-            with progress.provider(provider) as p:
-                await provider.apply(p)
+            progress.mark_fetched(await provider.prefetch(stdout_callback=progress.log))
+
+    async def update(self, progress: UpdatableProgress, force: bool = False, **kw) -> None:
+        if not progress.reached('source'):
+            await super().update(progress, **kw)  # pull
+            progress.checkpoint('source')
+
+        if release := await self.source.staged_release():
+            await self._switch_release(progress, release)
+
+        pool = WorkerPool(len(self.providers))
+        tasks: dict[Provider, asyncio.Future] = {}
+        graph = provider_graph(self.providers)
+        for provider in ordered(graph):
+            tasks[provider] = pool.submit(
+                self._apply_provider(progress, provider, force),
+                after=[tasks[dependency] for dependency in graph[provider]]
+            )
+        await pool.join()
+
+        self._notify_triggers(progress)
+
+        recipe_hash = await self._hash_recipe()
+        self.lock.recipie_hash_current = recipe_hash
+        self.lock.recipie_hash_installed = recipe_hash
+        self.lock.current_options = self.options
+        self.lock.current_version = self.lock.remote_version
+        self.lock.commits_behind = []
+
+    async def _switch_release(self, progress: UpdatableProgress, release: str) -> None:
+        with progress.sources(self.source) as p:
+            for provider in self.providers:
+                await provider.prepare(release, stdout_callback=p.log)
+
+            # the source switches last, until then a resumed update finds the release still staged
+            for provider in self.providers:
+                await provider.switch(release)
+            await self.source.switch_release(release)
+            p.log_changed(f'switched to {release}')
+
+        self._flush()
+
+    async def rollback(self, progress: UpdatableProgress) -> bool:
+        with progress.sources(self.source) as p:
+            if not (release := await self.source.rollback()):
+                p.log_unchanged('no previous release')
+                return False
+
+            for provider in self.providers:
+                await provider.switch(release)
+            p.log_changed(f'rolled back to {release}')
 
+        self._flush()
+        self._notify_triggers(progress)
+
+        # the release rolled back to knows an older upstream, the next refresh fetches again
+        self.lock.remote_tip = None
+        await self.refresh()
+        return True
+
+    def _notify_triggers(self, progress: UpdatableProgress) -> None:
         if self.manifest.triggers:
             for trigger in self.manifest.triggers.collect(
                 options=self.options,
@@ -119,12 +204,21 @@ class Package(Updatable):
             ):
                 progress.notify(trigger.trigger)
 
-        recipe_hash = await self._hash_recipe()
-        self.lock.recipie_hash_current = recipe_hash
-        self.lock.recipie_hash_installed = recipe_hash
-        self.lock.current_options = self.options
-        self.lock.current_version = self.lock.remote_version
-        self.lock.commits_behind = []
+    async def _apply_provider(self, progress: UpdatableProgress, provider: Provider, force: bool) -> None:
+        step = f'provider:{provider.DISCRIMINATOR}'
+        provided = self.lock.provided.by(provider)
+        if progress.reached(step):
+            return
+        if not force and provided.fingerprint and provided.fingerprint == provider.fingerprint():
+            return
+
+        provided.fingerprint = None
+        async with progress.resources(provider.resources):
+            with progress.provider(provider) as p:
+                await provider.apply(p)
+
+        provided.fingerprint = provider.fingerprint() if provider.configured else None
+        progress.checkpoint(step)
 
     async def remove(self, progress: UpdatableProgress) -> None:
         progress.mark_removing()
@@ -144,7 +238,10 @@ class Package(Updatable):
                 progress.notify(trigger.trigger)
 
         with progress.sources(self.source) as p:
-            if os.path.exists(self.source.path):
+            if os.path.islink(self.source.path):
+                Releases(self.source.path).remove()
+                p.log_removed('removed')
+            elif os.path.exists(self.source.path):
                 shutil.rmtree(self.source.path, ignore_errors=True)
                 p.log_removed('removed')
             else:
@@ -160,24 +257,52 @@ class Package(Updatable):
             },
         }
 
+    def _recipe_sections(self) -> list[bytes]:
+        return [
+            dump(encode(self.manifest.data_source), None).strip().encode('utf-8'),
+            dump(encode(self.manifest.provides), None).strip().encode('utf-8'),
+            dump(encode(self.manifest.triggers), None, ).strip().encode('utf-8'),
+        ]
+
     async def _hash_recipe(self):
-        hash_object = hashlib.sha256()
-        hash_object.update(dump(encode(self.manifest.data_source), None).strip().encode('utf-8'))
-        hash_object.update(dump(encode(self.manifest.provides), None).strip().encode('utf-8'))
-        hash_object.update(dump(encode(self.manifest.triggers), None, ).strip().encode('utf-8'))
+        sections = self._recipe_sections()
 
         if not isinstance(self.source, InternalDataSource) and not os.path.exists(self.source.path):
+            hash_object = hashlib.sha256(b''.join(sections))
             hash_object.update('[UNKNOWN]'.strip().encode('utf-8'))
             return hash_object.hexdigest()
 
-        for provider in self.providers:
-            for path in provider.files:
+        # files are read only when they changed on disk since their digest was taken
+        files = [path for provider in self.providers for path in provider.files]
+        digests = await fingerprints.digests(files)
+
+        hash_object = hashlib.sha256(b''.join(sections))
+        for path in files:
+            if (digest := digests[path]) is None:
+                if isinstance(self.source, InternalDataSource):
+                    continue
+                raise FileNotFoundError(path)
+
+            hash_object.update(digest.encode('ascii'))
+
+        return hash_object.hexdigest()
+
+    async def _legacy_recipe_hash(self) -> str:
+        # recipe hashes used to cover the file contents themselves, installs recorded that way are recognized once
+        sections = self._recipe_sections()
+        files = [path for provider in self.providers for path in provider.files]
+
+        def compute():
+            hash_object = hashlib.sha256(b''.join(sections))
+            for path in files:
                 if isinstance(self.source, InternalDataSource) and not os.path.exists(path):
                     continue
 
                 hash_object.update(readfile(path).encode('utf-8'))
 
-        return hash_object.hexdigest()
+            return hash_object.hexdigest()
+
+        return await asyncio.get_event_loop().run_in_executor(None, compute)
 
     def _flush(self):
         self.__dict__.pop('source', None)
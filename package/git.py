@@ -12,8 +12,9 @@ from . import package
 from .base import Package
 from ..adapter.yaml import load
 from ..manifest import Manifest
+from ..manifest.remote import remote_manifests
 from ..paths import paths
-from ..qbefile.utils import CONFIG_FILE_NAMES
+from ..qbefile.utils import CONFIG_FILE_NAMES, find_in
 
 if TYPE_CHECKING:
     from ..qbefile.dependency.git import GitDependency
@@ -37,7 +38,19 @@ class GitPackage(Package):
         try:
             return super().manifest
         except:
-            return Manifest.decode(self._load_remote_manifest())
+            url, branch = self._dependency.identifier.id, self._dependency.branch
+            return Manifest.decode(remote_manifests.cached(url, branch) or self._load_remote_manifest())
+
+    async def load_manifest(self) -> None:
+        try:
+            find_in(self.package_path)
+        except FileNotFoundError:
+            await remote_manifests.load(self._dependency.identifier.id, self._dependency.branch)
+            self._flush()
+
+    async def refresh(self, **kw):
+        await self.load_manifest()
+        await super().refresh(**kw)
 
     @property
     def slug(self):
@@ -59,13 +72,16 @@ class GitPackage(Package):
         return self.manifest.name or path.split('/')[-1]
 
     def _load_remote_manifest(self):
+        # blocking, only used when nothing was ever loaded for this package - load_manifest fills the cache
         for file_name in CONFIG_FILE_NAMES:
             command = f"git archive --remote={self._dependency.identifier.id} {self._dependency.branch} {file_name}"
             try:
                 tarball = subprocess.check_output(command, shell=True)
                 tar = tarfile.open(fileobj=io.BytesIO(tarball))
                 file = tar.extractfile(file_name)
-                return load(file.read().decode())
+                return remote_manifests.remember(
+                    self._dependency.identifier.id, self._dependency.branch, load(file.read().decode())
+                )
             except subprocess.CalledProcessError:
                 pass
         else:
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    from .base import Package
+    from ..provider.base import Provider
+
+
+T = TypeVar('T')
+
+
+def _is_within(path: str, directory: str) -> bool:
+    path = os.path.normpath(path)
+    directory = os.path.normpath(directory)
+    return path == directory or path.startswith(directory + os.sep)
+
+
+def dependency_graph(packages: list[Package]) -> dict[Package, list[Package]]:
+    # a package depends on every other package whose tree its providers write into,
+    # e.g. klipper extensions are linked into klipper's `klippy/extras`
+    graph: dict[Package, list[Package]] = {}
+
+    for package in packages:
+        targets = package.targets
+        graph[package] = [
+            other for other in packages
+            if other is not package and any(_is_within(target, other.source.path) for target in targets)
+        ]
+
+    return graph
+
+
+def provider_graph(providers: list[Provider]) -> dict[Provider, list[Provider]]:
+    # within a package providers only wait for those they declare, e.g. config files need the apt packages in place
+    return {
+        provider: [other for other in providers if other.DISCRIMINATOR in provider.AFTER]
+        for provider in providers
+    }
+
+
+def ordered(graph: dict[T, list[T]]) -> list[T]:
+    result: list[T] = []
+    visiting: set[T] = set()
+    visited: set[T] = set()
+
+    def visit(node: T):
+        if node in visited:
+            return
+        if node in visiting:
+            raise ValueError(f'Circular dependency detected at {node}')
+
+        visiting.add(node)
+        for dependency in graph[node]:
+            visit(dependency)
+        visiting.remove(node)
+
+        visited.add(node)
+        result.append(node)
+
+    for node in graph:
+        visit(node)
+
+    return result
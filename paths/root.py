@@ -35,6 +35,22 @@ class Paths:
     def venvs(self):
         return os.path.join('/', 'var', 'opt')
 
+    @property
+    def cache(self):
+        return os.path.join('/', 'var', 'cache', 'qbe')
+
+    @property
+    def staging(self):
+        return os.path.join(self.cache, 'staging')
+
+    @property
+    def git_store(self):
+        return os.path.join(self.cache, 'git')
+
+    @property
+    def http_cache(self):
+        return os.path.join(self.cache, 'http')
+
     @property
     def firmwares(self):
         return os.path.join(self.config_root, 'firmware')
@@ -60,3 +76,9 @@ class Paths:
 
     def venv(self, slug: str):
         return str(os.path.join(self.venvs, slug))
+
+    def wheels(self, slug: str):
+        return str(os.path.join(self.staging, 'wheels', slug))
+
+    def releases(self, slug: str):
+        return str(os.path.join(self.staging, 'releases', slug))
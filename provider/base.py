@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 from abc import abstractmethod
+import hashlib
+import json
 import os
-from typing import TYPE_CHECKING, Type, TypeVar, Generic, Union, Optional
+from typing import TYPE_CHECKING, Callable, Type, TypeVar, Generic, Union, Optional
 
+from ..adapter.dataclass import encode
+from ..adapter.fingerprint import fingerprints
 from ..adapter.yaml import PkgTag, VarTag
 from ..updatable.data_source.internal import InternalDataSource
 
@@ -25,11 +29,15 @@ T = TypeVar('T', bound=Config)
 class Provider(Generic[T]):
     DISCRIMINATOR: str
     CONFIG: Type[T]
+    AFTER: tuple[str, ...] = ('system-packages',)
 
     def __init__(self, updatable: Updatable, config: Optional[T]):
         self._updatable = updatable
         self._config = config
 
+    def __str__(self) -> str:
+        return self.DISCRIMINATOR
+
     @abstractmethod
     async def apply(self, progress: IProviderProgress):
         pass
@@ -38,11 +46,44 @@ class Provider(Generic[T]):
     async def remove(self, progress: IProviderProgress):
         pass
 
+    async def prefetch(self, stdout_callback: Optional[Callable[[str], None]] = None) -> int:
+        return 0
+
+    async def prepare(self, release: str, stdout_callback: Optional[Callable[[str], None]] = None) -> None:
+        pass
+
+    async def switch(self, release: str) -> None:
+        pass
+
     @property
     @abstractmethod
     def files(self) -> list[str]:
         pass
 
+    @property
+    def targets(self) -> list[str]:
+        return []
+
+    @property
+    def configured(self) -> bool:
+        return self._config is not None
+
+    def fingerprint(self) -> str:
+        # everything apply depends on, targets are included so removed or edited outputs get restored
+        context = self._updatable.template_context()
+        data = {
+            'config': encode(self._config),
+            'version': self._updatable.lock.remote_version,
+            'context': {k: context[k] for k in ('user', 'dirs', 'options')},
+            'files': fingerprints.signature(self.files)['files'],
+            'targets': fingerprints.signature(self.targets)['files'],
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    @property
+    def resources(self) -> set[str]:
+        return set(self.targets)
+
     def _base_path(self, file: Union[PkgTag, str]):
         source = self._updatable.source
         if isinstance(file, PkgTag) and isinstance(source, InternalDataSource):
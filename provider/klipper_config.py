@@ -23,8 +23,16 @@ class KlipperConfigProvider(OperationMixin[OperationConfig]):
     DISCRIMINATOR = 'klipper-config'
     CONFIG = OperationConfig
 
+    @property
+    def target(self) -> str:
+        return paths.klipper.configs
+
+    @property
+    def link_target(self) -> Optional[str]:
+        return paths.klipper.config_links
+
     async def apply(self, progress: IProviderProgress):
-        if await self.apply_operations(progress, paths.klipper.configs, paths.klipper.config_links):
+        if await self.apply_operations(progress):
             progress.notify(GCodeTrigger('FIRMWARE_RESTART'))
 
     async def remove(self, progress: IProviderProgress):
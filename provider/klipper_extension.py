@@ -17,8 +17,12 @@ class KlipperExtensionProvider(OperationMixin[LinkConfig]):
     DISCRIMINATOR = 'klipper-extension'
     CONFIG = LinkConfig
 
+    @property
+    def target(self) -> str:
+        return paths.klipper.extensions
+
     async def apply(self, progress: IProviderProgress):
-        if await self.apply_operations(progress, paths.klipper.extensions):
+        if await self.apply_operations(progress):
             progress.notify(ServiceReloadTrigger('klipper.service', restart=True))
 
     async def remove(self, progress: IProviderProgress):
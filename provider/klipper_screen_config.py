@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from . import provider
 from .operation import OperationConfig, OperationMixin
@@ -16,8 +16,16 @@ class KlipperScreenConfigProvider(OperationMixin[OperationConfig]):
     DISCRIMINATOR = 'klipper-screen-config'
     CONFIG = OperationConfig
 
+    @property
+    def target(self) -> str:
+        return paths.klipper_screen.configs
+
+    @property
+    def link_target(self) -> Optional[str]:
+        return paths.klipper_screen.config_links
+
     async def apply(self, progress: IProviderProgress):
-        if await self.apply_operations(progress, paths.klipper_screen.configs, paths.klipper_screen.config_links):
+        if await self.apply_operations(progress):
             progress.notify(ServiceReloadTrigger('KlipperScreen.service', restart=True))
 
     async def remove(self, progress: IProviderProgress):
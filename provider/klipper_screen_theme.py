@@ -16,8 +16,12 @@ class KlipperExtensionProvider(OperationMixin[LinkConfig]):
     DISCRIMINATOR = 'klipper-screen-theme'
     CONFIG = LinkConfig
 
+    @property
+    def target(self) -> str:
+        return paths.klipper_screen.themes
+
     async def apply(self, progress: IProviderProgress):
-        if await self.apply_operations(progress, paths.klipper_screen.themes):
+        if await self.apply_operations(progress):
             progress.notify(ServiceReloadTrigger('KlipperScreen.service', restart=True))
 
     async def remove(self, progress: IProviderProgress):
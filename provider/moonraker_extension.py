@@ -17,8 +17,12 @@ class MoonrakerExtensionProvider(OperationMixin[LinkConfig]):
     DISCRIMINATOR = 'moonraker-extension'
     CONFIG = LinkConfig
 
+    @property
+    def target(self) -> str:
+        return paths.moonraker.extensions
+
     async def apply(self, progress: IProviderProgress):
-        if await self.apply_operations(progress, paths.moonraker.extensions):
+        if await self.apply_operations(progress):
             progress.notify(ServiceReloadTrigger('moonraker.service', restart=True))
 
     async def remove(self, progress: IProviderProgress):
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from abc import ABC
+from abc import ABC, abstractmethod
 from asyncio import iscoroutine
 from dataclasses import fields, dataclass
 import os
@@ -29,7 +29,16 @@ T = TypeVar('T', bound=Config)
 
 
 class OperationMixin(Provider[T], ABC):
-    async def apply_operations(self, progress: IProviderProgress, target: str, link_target: Optional[str] = None):
+    @property
+    @abstractmethod
+    def target(self) -> str:
+        pass
+
+    @property
+    def link_target(self) -> Optional[str]:
+        return None
+
+    async def apply_operations(self, progress: IProviderProgress):
         changed = False
         for field in self._current_config_fields():
             operations: list[SrcDst] = getattr(self._config, field.name, [])
@@ -41,7 +50,7 @@ class OperationMixin(Provider[T], ABC):
                             continue
 
                         source = self._src_path(operation.source)
-                        destination = self._target_path(field, operation, target, link_target)
+                        destination = self._target_path(field, operation)
 
                         with p.sub(self._sub_name(operation, source, destination), case=True) as pp:
                             exists = os.path.exists(destination)
@@ -100,19 +109,34 @@ class OperationMixin(Provider[T], ABC):
 
         return result
 
+    @property
+    def targets(self) -> list[str]:
+        result = []
+
+        for field in self._current_config_fields():
+            if not field.metadata.get('operation_handler', None):
+                continue
+
+            operations: list[SrcDst] = getattr(self._config, field.name, [])
+            for operation in operations:
+                if operation.available(self._updatable.options):
+                    result.append(self._target_path(field, operation))
+
+        return result
+
     def _current_config_fields(self):
         return fields(self._config) if self._config else []
 
     def _config_fields(self):
         return fields(self._config) if self._config else fields(self.CONFIG)
 
-    def _target_path(self, field, operation, target: str, link_target: Optional[str] = None):
+    def _target_path(self, field, operation):
         op_target = self._dst_path(operation.target)
         if isinstance(operation.target, VarTag):
             return op_target
 
-        is_link_target = field.metadata.get('link_target', False) and link_target
-        target_dir = link_target if is_link_target else target
+        is_link_target = field.metadata.get('link_target', False) and self.link_target
+        target_dir = self.link_target if is_link_target else self.target
         return os.path.join(target_dir, op_target)
 
     def _short_path(self, op_path, path, is_source=False):
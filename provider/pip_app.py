@@ -1,22 +1,25 @@
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass
 from functools import cached_property
 import os
 import re
 import shutil
+import tempfile
 from typing import Optional, TYPE_CHECKING, Callable, Union
 
 from . import provider
 from .base import Provider
 from .operation import SrcDst
-from ..adapter.command import pip, shell, sudo_write, sudo_systemctl_service, sudo_rm
+from ..adapter.command import pip, shell, sudo_write, sudo_systemctl_service, sudo_rm, CommandError
 from ..adapter.dataclass import field
 from ..adapter.file import readfile
 from ..adapter.jinja import render
 from ..adapter.yaml import PkgTag
 from ..paths import paths
 from ..trigger.service_reload import ServiceReloadTrigger
+from ..updatable.data_source.releases import Releases
 from ..updatable.progress.formatter import MessageType
 
 if TYPE_CHECKING:
@@ -45,6 +48,8 @@ class PipAppProvider(Provider[PipAppConfig]):
     DISCRIMINATOR = 'pip-app'
     CONFIG = PipAppConfig
 
+    _prefetched = False
+
     @cached_property
     def pkg(self):
         return self._updatable.template_context()['dirs']['pkg']
@@ -53,6 +58,102 @@ class PipAppProvider(Provider[PipAppConfig]):
     def venv(self):
         return self._updatable.template_context()['dirs']['venv']
 
+    @cached_property
+    def wheels(self):
+        return paths.wheels(os.path.basename(self.venv))
+
+    async def prefetch(self, stdout_callback: Optional[Callable[[str], None]] = None) -> int:
+        if not self._config or not (self._config.pip_requirements or self._config.pip_packages):
+            return 0
+
+        requirements = await self._upcoming_requirements()
+        if not self._config.pip_packages and requirements is None:
+            return 0
+
+        size = self._wheels_size()
+        os.makedirs(self.wheels, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as requirements_file:
+            args = [*self._config.pip_packages]
+            if requirements is not None:
+                requirements_file.write(requirements)
+                requirements_file.flush()
+                args.extend(['-r', requirements_file.name])
+
+            # resolved by the interpreter the packages are installed for, a fresh virtualenv is created from paths.python
+            await pip(
+                f'download --dest {self.wheels} ' + ' '.join(args),
+                python=os.path.join(self.venv, 'bin', 'python') if os.path.isdir(self.venv) else paths.python,
+                cwd=self.pkg if os.path.isdir(self.pkg) else None,
+                stdout_callback=stdout_callback
+            )
+
+        self._prefetched = True
+        return self._wheels_size() - size
+
+    async def _upcoming_requirements(self) -> Optional[str]:
+        # the working tree still holds the installed version, or nothing yet on a fresh install
+        if not self._config or not self._config.pip_requirements:
+            return None
+
+        requirements = self._config.pip_requirements
+        if self._base_path(requirements) != self.pkg:
+            file = self._src_path(requirements)
+            return readfile(file) if os.path.exists(file) else None
+
+        return await self._updatable.source.upcoming_file(str(requirements))
+
+    def _wheels_size(self) -> int:
+        if not os.path.isdir(self.wheels):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.wheels) if entry.is_file())
+
+    async def prepare(self, release: str, stdout_callback: Optional[Callable[[str], None]] = None) -> None:
+        if not self._config or not os.path.isdir(self.venv):
+            return
+
+        log = stdout_callback or (lambda message: None)
+
+        # the running virtualenv is copied next to it, its scripts keep working as their shebangs go through the symlink
+        releases = Releases(self.venv)
+        releases.adopt(Releases(self.pkg).current or release)
+        venv = releases.release_path(release)
+        if not os.path.isdir(venv):
+            log('copying virtualenv...')
+            tmp = releases.release_path(f'.{release}')
+            shutil.rmtree(tmp, ignore_errors=True)
+            await shell(f'cp -a {os.path.realpath(self.venv)} {tmp}')
+            os.rename(tmp, venv)
+
+        # only new requirements are installed ahead, apply reconciles the rest once switched
+        staged = copy.copy(self)
+        staged.__dict__.update(pkg=Releases(self.pkg).release_path(release), venv=venv, wheels=self.wheels)
+        packages = await staged._installed_packages()
+        if self._config.pip_packages:
+            await staged._pip_install_packages(packages, self._config.pip_packages, log)
+        if self._config.pip_requirements and os.path.exists(staged._src_path(self._config.pip_requirements)):
+            await staged._pip_install_requirements(packages, self._config.pip_requirements, log)
+
+        self._relink_scripts(venv)
+
+    def _relink_scripts(self, venv: str) -> None:
+        # scripts pip just installed call the release interpreter, which is pruned later on, the symlink stays
+        staged, live = f'#!{venv}/bin/'.encode(), f'#!{self.venv}/bin/'.encode()
+        for entry in os.scandir(os.path.join(venv, 'bin')):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+
+            with open(entry.path, 'rb') as f:
+                content = f.read()
+            if content.startswith(staged):
+                with open(entry.path, 'wb') as f:
+                    f.write(live + content[len(staged):])
+
+    async def switch(self, release: str) -> None:
+        releases = Releases(self.venv)
+        if os.path.isdir(releases.release_path(release)):
+            releases.switch(release)
+            releases.prune()
+
     async def apply(self, progress: IProviderProgress):
         if self._config:
             with progress.sub('virtualenv') as p:
@@ -124,12 +225,15 @@ class PipAppProvider(Provider[PipAppConfig]):
 
         with progress.sub('pip') as p:
             await self._cleanup_pip(p, progress.provided, removing=True)
+        shutil.rmtree(self.wheels, ignore_errors=True)
 
         virtualenvs = list(filter(lambda e: e.path == ('virtualenv',), progress.provided))
         virtualenv = virtualenvs[0] if len(virtualenvs) > 0 else None
         if virtualenv:
             with progress.sub('virtualenv') as p:
-                if os.path.exists(virtualenv.output) and os.path.isdir(virtualenv.output):
+                if os.path.islink(virtualenv.output):
+                    Releases(virtualenv.output).remove()
+                elif os.path.exists(virtualenv.output) and os.path.isdir(virtualenv.output):
                     shutil.rmtree(virtualenv.output, ignore_errors=True)
                 p.log_removed('removed', virtualenv)
 
@@ -150,6 +254,11 @@ class PipAppProvider(Provider[PipAppConfig]):
                 else:
                     pp.log_removed('retained', entry, typ=MessageType.WARNING)
 
+    def _base_path(self, file: Union[PkgTag, str]):
+        # follows pkg, which points into the prepared release while it is being set up
+        base = super()._base_path(file)
+        return self.pkg if base == self._updatable.source.path else base
+
     @property
     def files(self) -> list[str]:
         if not self._config:
@@ -160,14 +269,23 @@ class PipAppProvider(Provider[PipAppConfig]):
             *[self._src_path(service.source) for service in self._config.services],
         ]))
 
+    @property
+    def targets(self) -> list[str]:
+        if not self._config:
+            return []
+
+        return [
+            self.venv,
+            *[os.path.join('/etc/systemd/system', service.target) for service in self._config.services],
+        ]
+
     # TODO: check versions, handle mixing and changes (removal)
     async def _pip_install_packages(self, current_packages: set[str], packages: list[str], stdout_callback: Callable[[str], None]):
         if all([self._parse_pkg(e)[0] in current_packages for e in packages]):
             return False
 
         stdout_callback('installing pip packages...')
-        command = ' '.join(['install', *packages])
-        await pip(command, venv=self.venv, cwd=self.pkg, stdout_callback=stdout_callback)
+        await self._pip_install(' '.join(packages), stdout_callback=stdout_callback)
         return True
 
     async def _pip_install_self(self, current_packages: set[str], stdout_callback: Callable[[str], None]):
@@ -192,7 +310,8 @@ class PipAppProvider(Provider[PipAppConfig]):
 
         stdout_callback('installing pip requirements...')
 
-        await pip('install --editable .', venv=self.venv, cwd=self.pkg, stdout_callback=stdout_callback)
+        # dependencies of the package itself are not prefetched
+        await self._pip_install('--editable .', stdout_callback=stdout_callback, index_fallback=True)
         return True
 
     async def _pip_install_requirements(self, current_packages: set[str], requirements: Union[str, PkgTag], stdout_callback: Callable[[str], None]):
@@ -207,14 +326,31 @@ class PipAppProvider(Provider[PipAppConfig]):
 
         stdout_callback('installing pip requirements...')
 
-        command = 'install -r ' + self._src_path(requirements)
-        await pip(
-            command, venv=self.venv, cwd=self.pkg,
+        await self._pip_install(
+            '-r ' + self._src_path(requirements),
             env={'PATH': os.path.join(self.venv, 'bin') + ':' + os.environ['PATH']},
             stdout_callback=stdout_callback
         )
         return True
 
+    async def _pip_install(
+            self, args: str, stdout_callback: Callable[[str], None], env: Optional[dict] = None, index_fallback=False
+    ):
+        if os.path.isdir(self.wheels) and os.listdir(self.wheels):
+            try:
+                await pip(
+                    f'install --no-index --find-links {self.wheels} {args}', venv=self.venv, cwd=self.pkg,
+                    env=env, stdout_callback=stdout_callback
+                )
+                return
+            except CommandError:
+                # wheels downloaded in this run cover the requirements, the index is not contacted while applying
+                if self._prefetched and not index_fallback:
+                    raise
+                stdout_callback('prefetched packages incomplete, installing from index...')
+
+        await pip(f'install {args}', venv=self.venv, cwd=self.pkg, env=env, stdout_callback=stdout_callback)
+
     async def _virtualenv(self, stdout_callback: Callable[[str], None]):
         command = f'virtualenv -p {paths.python} {self.venv}'
         await shell(command, cwd=self.pkg, stdout_callback=stdout_callback)
@@ -16,8 +16,12 @@ class SystemConfigProvider(OperationMixin[SystemOperationConfig]):
     DISCRIMINATOR = 'system-config'
     CONFIG = SystemOperationConfig
 
+    @property
+    def target(self) -> str:
+        return '/'
+
     async def apply(self, progress: IProviderProgress):
-        await self.apply_operations(progress, '/')
+        await self.apply_operations(progress)
 
     async def remove(self, progress: IProviderProgress):
         await self.remove_operations(progress)
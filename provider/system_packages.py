@@ -30,6 +30,7 @@ class SystemPackagesConfig:
 @provider
 class SystemPackagesProvider(Provider[SystemPackagesConfig]):
     DISCRIMINATOR = 'system-packages'
+    AFTER = ()
     CONFIG = SystemPackagesConfig
 
     @staticmethod
@@ -61,5 +62,11 @@ class SystemPackagesProvider(Provider[SystemPackagesConfig]):
     def files(self) -> list[str]:
         return []
 
+    @property
+    def resources(self) -> set[str]:
+        if self._config and self._config.packages and package_manager:
+            return {package_manager}
+        return set()
+
     async def remove(self, progress: IProviderProgress):
         pass  # something else may use, leaving for now
@@ -15,8 +15,12 @@ class UserConfigProvider(OperationMixin[OperationConfig]):
     DISCRIMINATOR = 'user-config'
     CONFIG = OperationConfig
 
+    @property
+    def target(self) -> str:
+        return paths.config_root
+
     async def apply(self, progress: IProviderProgress):
-        await self.apply_operations(progress, paths.config_root)
+        await self.apply_operations(progress)
 
     async def remove(self, progress: IProviderProgress):
         await self.remove_operations(progress)
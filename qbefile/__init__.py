@@ -5,6 +5,7 @@ from .dependency import build as build_dependency, Dependency
 from .mcu import build as build_mcu, BaseMCU
 from ..adapter.file import readfile
 from ..adapter.yaml import load as load_yaml
+from ..settings import settings
 
 
 class QBEFile:
@@ -28,12 +29,14 @@ class QBEFile:
     def load(self):
         data = load_yaml(readfile(self._path))
 
+        settings.load(data.pop('settings', None) or {})
         self._requires = [build_dependency(dep) for dep in data.pop('requires', [])]
         self._mcus = [build_mcu(name, mcu) for name, mcu in data.pop('mcus', {}).items()]
 
     def update(self):
         data = load_yaml(readfile(self._path))
 
+        settings.load(data.pop('settings', None) or {})
         added = Changed.new()
 
         new_packages = [build_dependency(dep) for dep in data.pop('requires', [])]
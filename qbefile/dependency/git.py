@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from functools import cached_property
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from . import dependency
 from .base import Dependency
@@ -18,15 +18,27 @@ class GitDependency(Dependency):
     def __init__(self, data: dict):
         super().__init__(data)
         self._branch = data.pop('branch', 'master')
+        self._depth = data.pop('depth', None)
+        self._filter = data.pop('filter', None)
 
     @property
     def branch(self) -> str:
         return self._branch
 
+    @property
+    def depth(self) -> Optional[int]:
+        return self._depth
+
+    @property
+    def filter(self) -> Optional[str]:
+        return self._filter
+
     @cached_property
     def data_source(self) -> ManifestDataSource:
-        return GitDataSource(url=self.identifier.id, branch=self.branch)
+        return GitDataSource(url=self.identifier.id, branch=self.branch, depth=self.depth, filter=self.filter)
 
     def update(self, source: GitDependency) -> None:
         super().update(source)
         self._branch = source._branch
+        self._depth = source._depth
+        self._filter = source._filter
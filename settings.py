@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Optional
+
+from .adapter.dataclass import UniversalDecoder, field
+
+
+@dataclass
+class Settings(UniversalDecoder):
+    """QBE settings"""
+    fetch_all_branches: bool = field(default=False, name='fetch-all-branches', omitempty=True)
+    git_backend: str = field(default='cli', name='git-backend', omitempty=True)
+    http_connect_timeout: float = field(default=10.0, name='http-connect-timeout', omitempty=True)
+    http_read_timeout: float = field(default=30.0, name='http-read-timeout', omitempty=True)
+    http_retries: int = field(default=3, name='http-retries', omitempty=True)
+    github_api: str = field(default='https://api.github.com', name='github-api', omitempty=True)
+    github_token: Optional[str] = field(default=None, name='github-token', omitempty=True)
+    deploy: str = field(default='in-place', omitempty=True)
+
+    def load(self, data: dict) -> None:
+        defaults = Settings()
+        for f in fields(self):
+            setattr(self, f.name, getattr(defaults, f.name))
+
+        for k, v in self._decode_params(data).items():
+            setattr(self, k, v)
+
+
+settings = Settings()
+
+__all__ = ['settings']
@@ -12,6 +12,9 @@ setup(
     install_requires=[
         'Click', 'jinja2', 'dc-schema', 'requests', 'pyaml', 'tabulate', 'psutil', 'typing_extensions', 'inotify_simple'
     ],
+    extras_require={
+        'pygit2': ['pygit2']
+    },
     include_package_data=True,
     entry_points={
         'console_scripts': [
@@ -12,6 +12,7 @@ from ..paths import paths
 from ..nice_names import nice_names
 
 if TYPE_CHECKING:
+    from .progress.prefetch import PrefetchProgress
     from .progress.updatable import UpdatableProgress
     from .data_source.base import DataSource
     from ..lockfile.versioned import Versioned
@@ -28,6 +29,9 @@ class Updatable:
         self._lock = lock
         self._version = Version(lock)
 
+    def __str__(self) -> str:
+        return self.name
+
     @property
     def source(self) -> DataSource:
         return self._source
@@ -83,6 +87,9 @@ class Updatable:
         await self.source.refresh(self._lock, stdout_callback=progress.log if progress else None)
         self._flush()
 
+    async def prefetch(self, progress: PrefetchProgress, **kw) -> None:
+        progress.mark_fetched(await self.source.prefetch(self._lock, stdout_callback=progress.log))
+
     async def update(self, progress: UpdatableProgress, **kw) -> None:
         with progress.sources(self.source) as p:
             installing = not os.path.exists(self.source.path)
@@ -95,6 +102,9 @@ class Updatable:
             else:
                 p.log_unchanged('up to date')
 
+    async def rollback(self, progress: UpdatableProgress) -> bool:
+        return False
+
     def template_context(self):
         return {
             'user': getuser(),
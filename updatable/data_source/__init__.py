@@ -25,7 +25,10 @@ def for_local_path_and_manifest(
             return LocalDataSource(path, url=data_source.url)
 
         if isinstance(data_source, ManifestGitDataSource):
-            return GitDataSource(path, repo=data_source.url, branch=data_source.branch)
+            return GitDataSource(
+                path, repo=data_source.url, branch=data_source.branch,
+                depth=data_source.depth, filter=data_source.filter
+            )
 
         if isinstance(data_source, ManifestInternalDataSource):
             return LocalDataSource(path)
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import TYPE_CHECKING
+import os
+from typing import TYPE_CHECKING, Optional
+
+from ...adapter.file import readfile
 
 if TYPE_CHECKING:
     from ...lockfile.versioned import Versioned
@@ -23,6 +26,23 @@ class DataSource:
     async def refresh(self, lock: Versioned, **kw) -> None:
         raise NotImplementedError("Not implemented")
 
+    async def prefetch(self, lock: Versioned, **kw) -> int:
+        return 0
+
     @abstractmethod
     async def update(self, lock: Versioned, **kw) -> bool:
         raise NotImplementedError("Not implemented")
+
+    async def upcoming_file(self, path: str) -> Optional[str]:
+        """Content of path, relative to the source, in the version update installs"""
+        file = os.path.join(self.path, path)
+        return readfile(file) if os.path.exists(file) else None
+
+    async def staged_release(self) -> Optional[str]:
+        return None
+
+    async def switch_release(self, name: str) -> None:
+        pass
+
+    async def rollback(self) -> Optional[str]:
+        return None
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import os
+from typing import Optional
+
+from inotify_simple import INotify, flags  # type: ignore
+
+WATCH_FLAGS = (
+    flags.MODIFY | flags.ATTRIB | flags.CREATE | flags.DELETE |
+    flags.MOVED_FROM | flags.MOVED_TO | flags.DELETE_SELF
+)
+
+
+@dataclass
+class TrackedTree:
+    changed: bool = True
+    head: Optional[str] = None
+    dirty: bool = False
+    descriptors: dict[int, str] = field(default_factory=dict)
+
+
+class DirtyTracker:
+    def __init__(self) -> None:
+        self._inotify: Optional[INotify] = None
+        self._trees: dict[str, TrackedTree] = {}
+        self._descriptors: dict[int, str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._inotify is not None
+
+    @property
+    def _notifier(self) -> INotify:
+        # trees are only tracked while enabled
+        assert self._inotify is not None
+        return self._inotify
+
+    def enable(self) -> None:
+        if self._inotify is None:
+            self._inotify = INotify(nonblocking=True)
+
+    def cached(self, path: str, head: Optional[str]) -> Optional[bool]:
+        if not self.enabled or path not in self._trees:
+            return None
+
+        self._drain()
+        tree = self._trees[path]
+        if tree.changed or head is None or tree.head != head:
+            return None
+
+        return tree.dirty
+
+    def begin(self, path: str) -> None:
+        if not self.enabled:
+            return
+
+        if path not in self._trees:
+            self._watch(path)
+
+        # anything touched from now on, even while git is checking, invalidates the result
+        self._drain()
+        if tree := self._trees.get(path):
+            tree.changed = False
+
+    def store(self, path: str, head: Optional[str], dirty: bool) -> None:
+        if tree := self._trees.get(path):
+            tree.head = head
+            tree.dirty = dirty
+
+    def forget(self, path: str) -> None:
+        # watches follow inodes, a path switched to another tree has to be walked again
+        if self.enabled and path in self._trees:
+            self._forget(path)
+
+    def _watch(self, path: str) -> None:
+        tree = self._trees[path] = TrackedTree()
+        try:
+            for directory, dirs, _ in os.walk(path):
+                dirs[:] = [d for d in dirs if d != '.git']
+                self._add_watch(path, directory)
+        except OSError:
+            # most likely out of inotify watches, the tree is simply checked every time
+            self._forget(path)
+
+    def _add_watch(self, path: str, directory: str) -> None:
+        descriptor = self._notifier.add_watch(directory, WATCH_FLAGS)
+        self._trees[path].descriptors[descriptor] = directory
+        self._descriptors[descriptor] = path
+
+    def _forget(self, path: str) -> None:
+        tree = self._trees.pop(path)
+        for descriptor in tree.descriptors:
+            self._descriptors.pop(descriptor, None)
+            try:
+                self._notifier.rm_watch(descriptor)
+            except OSError:
+                pass
+
+    def _drain(self) -> None:
+        for evt in self._notifier.read(timeout=0):
+            if evt.mask & flags.Q_OVERFLOW:
+                for tree in self._trees.values():
+                    tree.changed = True
+                continue
+
+            path = self._descriptors.get(evt.wd)
+            if path is None or path not in self._trees:
+                continue
+
+            tree = self._trees[path]
+            if evt.mask & flags.IGNORED:
+                tree.descriptors.pop(evt.wd, None)
+                self._descriptors.pop(evt.wd, None)
+                continue
+
+            tree.changed = True
+            if evt.mask & flags.ISDIR and evt.mask & (flags.CREATE | flags.MOVED_TO) and evt.name != '.git':
+                try:
+                    self._add_watch(path, os.path.join(tree.descriptors[evt.wd], evt.name))
+                except (OSError, KeyError):
+                    self._forget(path)
+
+
+dirty_tracker = DirtyTracker()
@@ -1,18 +1,46 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
+import json
 import os.path
 import re
+import shutil
 import time
-from typing import TYPE_CHECKING, Optional, Callable
+from typing import TYPE_CHECKING, Awaitable, Optional, Callable
 
 from .base import DataSource
-from ...adapter.command import shell
+from .dirty_tracker import dirty_tracker
+from .git_backend import backend as git_backend, GitBackend
+from .git_store import git_store
+from .releases import Releases
+from ...adapter.command import shell, CommandError
+from ...adapter.file import readfile, writefile
+from ...paths import paths
+from ...settings import settings
 
 if TYPE_CHECKING:
     from ...lockfile.versioned import Versioned
 
 
+@dataclass
+class FetchResult:
+    updated: bool = False
+    tags: list[str] = field(default_factory=list)
+
+    def watch(self, out: Optional[Callable[[str], None]]) -> Callable[[str], None]:
+        def inner(message: str):
+            if '->' in message:
+                self.updated = True
+            if match := re.match(r'^\s*\S?\s*\[(?:new tag|tag update)]\s+(\S+)', message):
+                self.tags.append(match.group(1))
+
+            if out:
+                out(message)
+
+        return inner
+
+
 @dataclass(frozen=True)
 class Commit:
     sha: str
@@ -33,18 +61,21 @@ class TaggedCommit(Commit):
 
 class GitDataSource(DataSource):
     MAX_COMMITS = 30
-    GIT_LOG_FMT = (
-        "\"sha:%H%x1Dauthor:%an%x1Ddate:%ct%x1Dsubject:%s%x1Dmessage:%b%x1E\""
-    )
+    MAX_DEEPEN = 1000
     GIT_REF_FMT = (
         "'%(if)%(*objecttype)%(then)%(*objecttype) %(*objectname)"
         "%(else)%(objecttype) %(objectname)%(end) %(refname)'"
     )
 
-    def __init__(self, path: str, repo: Optional[str] = None, branch: Optional[str] = None) -> None:
+    def __init__(
+            self, path: str, repo: Optional[str] = None, branch: Optional[str] = None,
+            depth: Optional[int] = None, filter: Optional[str] = None
+    ) -> None:
         super().__init__(path)
         self._branch = branch
         self._url = repo
+        self._depth = depth
+        self._filter = filter
 
     @property
     def branch(self) -> str:
@@ -54,7 +85,104 @@ class GitDataSource(DataSource):
     def has_change_history(self) -> bool:
         return True
 
-    def _denoise_progress(self, out: Callable[[str], None]):
+    @property
+    def _git(self) -> GitBackend:
+        return git_backend(settings.git_backend)
+
+    @property
+    def _clone_args(self) -> str:
+        args = ''
+        if self._depth:
+            args = args + f' --depth={self._depth}'
+        if self._filter:
+            args = args + f' --filter={self._filter}'
+        return args
+
+    @property
+    def _uses_store(self) -> bool:
+        # a mirror always holds full history, shallow and partial clones keep fetching on their own
+        return bool(self._url) and not self._depth and not self._filter and git_store.available
+
+    @property
+    def _store_url(self) -> str:
+        # only used once _uses_store holds, which requires a url
+        assert self._url
+        return self._url
+
+    @property
+    def _blue_green(self) -> bool:
+        return settings.deploy == 'blue-green'
+
+    @property
+    def _fetched_branch(self) -> Optional[str]:
+        # tags are auto-followed, so only those pointing into the tracked branch are fetched
+        return None if settings.fetch_all_branches else self._branch or 'master'
+
+    async def _fetch(
+            self, repo: str, prune=False, initial=False, tip: Optional[str] = None, stdout_callback=None, stderr_callback=None
+    ) -> FetchResult:
+        prune_arg = ' --prune' if prune else ''
+        branch = self._fetched_branch
+        refspec = f" '+refs/heads/{branch or '*'}:refs/remotes/origin/{branch or '*'}'"
+        fetched = FetchResult()
+        stderr_callback = fetched.watch(stderr_callback)
+
+        if self._uses_store:
+            await git_store.fetch(self._store_url, branch=branch, stdout_callback=stdout_callback, tip=tip)
+            git_store.attach(repo, self._store_url)
+            mirror = git_store.mirror(self._store_url)
+            await shell(
+                f"git fetch{prune_arg} --progress --tags {mirror}{refspec}", cwd=repo,
+                stdout_callback=stdout_callback, stderr_callback=stderr_callback
+            )
+        else:
+            clone_args = self._clone_args if initial else ''
+            await shell(
+                f"git fetch{prune_arg} --progress{clone_args} origin{refspec if branch else ''}", cwd=repo,
+                stdout_callback=stdout_callback, stderr_callback=stderr_callback
+            )
+
+        # shallow repositories cannot use a commit-graph
+        if not self._depth and (fetched.updated or not self._has_commit_graph(repo)):
+            await shell('git commit-graph write --reachable --split --changed-paths', cwd=repo)
+        if fetched.tags or not os.path.exists(self._tag_index(repo)):
+            await self._update_tag_index(repo, fetched.tags if os.path.exists(self._tag_index(repo)) else None)
+
+        return fetched
+
+    @staticmethod
+    def _has_commit_graph(repo: str) -> bool:
+        info = os.path.join(repo, '.git', 'objects', 'info')
+        return os.path.exists(os.path.join(info, 'commit-graph')) or os.path.exists(os.path.join(info, 'commit-graphs'))
+
+    @staticmethod
+    def _tag_index(repo: str) -> str:
+        return os.path.join(repo, '.git', 'qbe-tags.json')
+
+    async def _update_tag_index(self, repo: str, tags: Optional[list[str]] = None) -> None:
+        # sha -> tag map, rebuilt fully only when missing, afterwards only fetched tags are refreshed
+        tagged_commits: dict[str, str] = {}
+        refs = "'refs/tags'"
+        if tags is not None:
+            tagged_commits = {sha: tag for sha, tag in json.loads(readfile(self._tag_index(repo))).items() if tag not in tags}
+            refs = ' '.join(f"'refs/tags/{tag}'" for tag in tags)
+
+        command = f"git for-each-ref --sort='-creatordate' --format={self.GIT_REF_FMT} {refs}"
+        resp = await shell(command, cwd=repo, raw_std=True)
+
+        for line in resp.split('\n'):
+            parts = line.strip().split()
+            if len(parts) != 3 or parts[0] != "commit":
+                continue
+            sha, ref = parts[1:]
+            tagged_commits[sha] = ref.split('/')[-1]
+
+        writefile(self._tag_index(repo), json.dumps(tagged_commits))
+
+    def _denoise_progress(self, out: Optional[Callable[[str], None]]):
+        if out is None:
+            return None
+
         last_decy = 0
         def inner(message: str):
             nonlocal last_decy
@@ -72,39 +200,136 @@ class GitDataSource(DataSource):
 
     async def refresh(self, lock: Versioned, stdout_callback=None) -> None:
         if os.path.exists(self.path):
-            await shell(f"git fetch --prune --progress origin", cwd=self.path, stdout_callback=self._denoise_progress(stdout_callback))
-
             if not self._branch:
                 self._branch = await self.get_branch()
 
-            lock.current_version = await self.local_version()
-            lock.remote_version = await self.remote_version()
-            lock.commits_behind = await self.new_commits()
+            # a single round trip tells whether the upstream moved since the last fetch
+            remote_tip = await self.remote_tip('origin', self._branch)
+            if remote_tip and remote_tip == lock.remote_tip:
+                fetched = FetchResult()
+            else:
+                fetched = await self._fetch(
+                    self.path, prune=True, tip=remote_tip, stdout_callback=self._denoise_progress(stdout_callback)
+                )
+
+            current_commit, upstream_commit = await self._git.resolve(self.path, 'HEAD', f'origin/{self._branch}')
+            tips = f'{current_commit}..{upstream_commit}'
+
+            if tips == lock.source_tips and not fetched.tags and lock.current_version != '?':
+                # nothing moved, only the working tree state has to be checked again
+                clean_version = lock.current_version.removesuffix('-dirty')
+                lock.current_version = clean_version + '-dirty' if await self.is_dirty(current_commit) else clean_version
+            else:
+                await self.enable_untracked_cache(self.path)
+                lock.current_version = await self.local_version(current_commit)
+                lock.remote_version = await self.remote_version()
+                lock.commits_behind = await self.new_commits(current_commit, upstream_commit)
+                lock.source_tips = tips
+            # a tip which did not arrive (e.g. pushed after the fetch) must not suppress the next fetch
+            lock.remote_tip = remote_tip if remote_tip == upstream_commit else None
         else:
             if stdout_callback:
                 stdout_callback(f'No local copy in "{self.path}"')
 
+            remote_tip = await self.remote_tip(self._url, self._branch or 'master') if self._url else None
+            if not remote_tip or remote_tip != lock.remote_tip or lock.remote_version == '?':
+                lock.remote_version = await self.remote_remote_version(remote_tip)
+
             lock.current_version = '?'
-            lock.remote_version = await self.remote_remote_version(self._branch or 'master')
             lock.commits_behind = []
+            lock.source_tips = None
+            lock.remote_tip = remote_tip
         lock.refresh_time = time.time()
 
+    @property
+    def staging_path(self) -> str:
+        return os.path.join(paths.staging, os.path.basename(self.path))
+
+    async def prefetch(self, lock: Versioned, stdout_callback=None, **kw) -> int:
+        if lock.current_version != '?' and lock.remote_version != '?' and lock.remote_version == lock.current_version:
+            return 0
+
+        if os.path.exists(self.path) and lock.remote_tip and await self.has_commit(lock.remote_tip):
+            # refresh already fetched the version it reported
+            return 0
+
+        denoised = self._denoise_progress(stdout_callback)
+        if self._uses_store:
+            # objects land in the shared mirror, a fresh install attaches to it on update
+            mirror = git_store.mirror(self._store_url)
+            size = await self.objects_size(mirror) if os.path.exists(mirror) else 0
+            if os.path.exists(self.path):
+                await self._fetch(self.path, stdout_callback=denoised, stderr_callback=denoised)
+                await self._refetched(lock)
+            else:
+                await git_store.fetch(self._store_url, branch=self._fetched_branch, stdout_callback=denoised)
+            return await self.objects_size(mirror) - size
+
+        if os.path.exists(self.path):
+            size = await self.objects_size(self.path)
+            await self._fetch(self.path, stdout_callback=denoised, stderr_callback=denoised)
+            await self._refetched(lock)
+            return await self.objects_size(self.path) - size
+
+        # objects for a fresh install are fetched aside, update moves them into place
+        repo = self.staging_path
+        if not os.path.exists(repo):
+            os.makedirs(repo)
+            await shell('git init', cwd=repo)
+            await shell(f'git remote add origin {self._url}', cwd=repo, stdout_callback=stdout_callback)
+
+        size = await self.objects_size(repo)
+        await self._fetch(repo, initial=True, stdout_callback=denoised, stderr_callback=denoised)
+        return await self.objects_size(repo) - size
+
+    async def upcoming_file(self, path: str) -> Optional[str]:
+        # prefetch leaves the upcoming version in one of these, the working tree still holds the installed one
+        branch = self._branch or 'master'
+        if os.path.exists(self.path):
+            repo, ref = self.path, f'origin/{branch}'
+        elif self._uses_store:
+            repo, ref = git_store.mirror(self._store_url), f'refs/heads/{branch}'
+        else:
+            repo, ref = self.staging_path, f'origin/{branch}'
+
+        if not os.path.exists(repo):
+            return None
+
+        try:
+            return await shell(f"git show '{ref}:{path}'", cwd=repo)
+        except CommandError:
+            return None
+
+    async def _refetched(self, lock: Versioned) -> None:
+        # upstream may have moved since refresh, update resets to whatever was fetched and records this version
+        if not self._branch:
+            self._branch = await self.get_branch()
+        lock.remote_version = await self.remote_version()
+
     async def update(self, lock: Versioned, stdout_callback=None) -> bool:
         if lock.current_version != '?' and lock.remote_version != '?' and lock.remote_version == lock.current_version:
             return False
 
         branch = self._branch or 'master'
         if not os.path.exists(self.path):
-            if stdout_callback:
-                stdout_callback('Cloning repository...')
+            if os.path.exists(self.staging_path) and not self._uses_store:
+                if stdout_callback:
+                    stdout_callback('Installing prefetched repository...')
+
+                shutil.move(self.staging_path, self.path)
+            else:
+                if stdout_callback:
+                    stdout_callback('Cloning repository...')
+
+                os.mkdir(self.path)
+                await shell('git init', cwd=self.path)
+                await shell(f'git remote add origin {self._url}', cwd=self.path, stdout_callback=stdout_callback)
+                denoised = self._denoise_progress(stdout_callback)
+                await self._fetch(self.path, initial=True, stdout_callback=denoised, stderr_callback=denoised)
 
-            os.mkdir(self.path)
-            await shell('git init', cwd=self.path)
-            await shell(f'git remote add origin {self._url}', cwd=self.path, stdout_callback=stdout_callback)
-            denoised = self._denoise_progress(stdout_callback)
-            await shell('git fetch --progress origin', cwd=self.path, stdout_callback=denoised, stderr_callback=denoised)
             await shell(f'git checkout -b {branch}', cwd=self.path, stdout_callback=stdout_callback)
             await shell(f'git reset --hard origin/{branch}', cwd=self.path, stdout_callback=stdout_callback)
+            await shell('git config core.untrackedCache true', cwd=self.path)
 
             if stdout_callback:
                 stdout_callback('Repository cloned!')
@@ -114,6 +339,15 @@ class GitDataSource(DataSource):
             await shell(f'git diff --quiet HEAD..origin/{branch}', cwd=self.path)
             return False
         except:
+            if self._blue_green:
+                if stdout_callback:
+                    stdout_callback('Preparing release...')
+
+                release = await self._prepare_release(branch)
+                if stdout_callback:
+                    stdout_callback(f'Release prepared in "{release}"')
+                return True
+
             if stdout_callback:
                 stdout_callback('Updating repository...')
 
@@ -124,18 +358,116 @@ class GitDataSource(DataSource):
 
         return True
 
+    async def _prepare_release(self, branch: str) -> str:
+        # the running tree is left untouched, the new one is checked out next to it and switched to later
+        current, target = await self._git.resolve(self.path, 'HEAD', f'origin/{branch}')
+        releases = Releases(self.path)
+        releases.adopt(current[:12])
+        dirty_tracker.forget(self.path)
+
+        release = releases.release_path(target[:12])
+        if os.path.isdir(release):
+            return release
+
+        # every release is an independent repository sharing objects through hardlinks, any of them can be removed
+        tmp = releases.release_path(f'.{target[:12]}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        source = os.path.realpath(self.path)
+        url = await shell('git remote get-url origin', cwd=source, strip=True)
+        await shell(f'git clone -q --local --no-checkout {source} {tmp}')
+        await shell(f'git fetch -q {source} +refs/remotes/origin/{branch}:refs/remotes/origin/{branch}', cwd=tmp)
+        await shell(f'git remote set-url origin {url}', cwd=tmp)
+        await shell(f'git checkout -q -B {branch} origin/{branch}', cwd=tmp)
+        await shell('git config core.untrackedCache true', cwd=tmp)
+        os.rename(tmp, release)
+        return release
+
+    async def staged_release(self) -> Optional[str]:
+        if not self._blue_green or not os.path.islink(self.path):
+            return None
+
+        # derived from the tree rather than the lockfile, so a release prepared before a crash is still found
+        releases = Releases(self.path)
+        target = (await self.rev_parse(f'origin/{self._branch or "master"}'))[:12]
+        if target != releases.current and os.path.isdir(releases.release_path(target)):
+            return target
+        return None
+
+    async def switch_release(self, name: str) -> None:
+        releases = Releases(self.path)
+        await self._carry_untracked(releases.release_path(name))
+        releases.switch(name)
+        releases.prune()
+        dirty_tracker.forget(self.path)
+
+    async def rollback(self) -> Optional[str]:
+        releases = Releases(self.path)
+        if (previous := releases.previous) and os.path.isdir(releases.release_path(previous)):
+            await self._carry_untracked(releases.release_path(previous))
+
+        name = releases.rollback()
+        dirty_tracker.forget(self.path)
+        return name
+
+    async def _carry_untracked(self, release: str) -> None:
+        # links other packages placed into the tree (e.g. klipper extensions) and local files like klipper's .config
+        # live outside of git, they are copied unless the release has its own version of them
+        source = os.path.realpath(self.path)
+        entries = (await shell('git ls-files -z --others', cwd=source)).split('\0')
+
+        def copy():
+            for entry in filter(None, entries):
+                target = os.path.join(release, entry)
+                if os.path.lexists(target):
+                    continue
+
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(source, entry), target, follow_symlinks=False)
+
+        await asyncio.get_event_loop().run_in_executor(None, copy)
+
+    @staticmethod
+    async def enable_untracked_cache(repo: str) -> None:
+        # clones made before it was set on checkout get it here
+        try:
+            if await shell('git config --get core.untrackedCache', cwd=repo, strip=True) == 'true':
+                return
+        except CommandError:
+            pass
+        await shell('git config core.untrackedCache true', cwd=repo)
+
+    @staticmethod
+    async def objects_stats(repo: str) -> dict[str, int]:
+        stats = {}
+        for line in (await shell('git count-objects -v', cwd=repo)).split('\n'):
+            key, _, value = line.partition(':')
+            if value.strip().isdigit():
+                stats[key.strip()] = int(value.strip())
+
+        return stats
+
+    @classmethod
+    async def objects_size(cls, repo: str) -> int:
+        stats = await cls.objects_stats(repo)
+        return (stats.get('size', 0) + stats.get('size-pack', 0)) * 1024
+
     async def get_branch(self):
         return await shell('git rev-parse --abbrev-ref HEAD', cwd=self.path, strip=True)
 
-    async def local_version(self):
-        return await shell('git describe --always --tags --long --abbrev=8 --dirty', cwd=self.path, strip=True)
+    async def local_version(self, head: Optional[str] = None):
+        version = await self._git.describe(self.path, 'HEAD')
+        return version + '-dirty' if await self.is_dirty(head) else version
 
     async def remote_version(self):
-        return await shell(f"git describe --always --tags --long --abbrev=8 origin/{self._branch}", cwd=self.path, strip=True)
+        return await self._git.describe(self.path, f'origin/{self._branch}')
+
+    async def remote_tip(self, remote: str, branch: str) -> Optional[str]:
+        cwd = self.path if os.path.exists(self.path) else None
+        resp = await shell(f"git ls-remote {remote} 'refs/heads/{branch}'", cwd=cwd, strip=True)
+        return resp.split(maxsplit=1)[0] if resp else None
 
-    async def remote_remote_version(self, branch: str):
-        hash_long = (await shell(f"git ls-remote --refs {self._url} {branch}", strip=True)).split(' ', maxsplit=1)[0]
-        hash_short = hash_long[:8]
+    async def remote_remote_version(self, hash_long: Optional[str]):
+        hash_short = (hash_long or '?')[:8]
 
         try:
             version = (await shell(f"git ls-remote --tags --sort=-v:refname {self._url} | head -n 1", strip=True)).split('/')[-1]
@@ -146,16 +478,32 @@ class GitDataSource(DataSource):
 
         return hash_short
 
-    async def new_commits(self):
+    async def is_dirty(self, head: Optional[str] = None) -> bool:
+        if (dirty := dirty_tracker.cached(self.path, head)) is not None:
+            return dirty
+
+        dirty_tracker.begin(self.path)
+        # stat information is refreshed first, so only files which really changed get compared
+        await shell('git update-index -q --refresh', cwd=self.path)
+        try:
+            await shell('git diff-index --quiet HEAD --', cwd=self.path)
+            dirty = False
+        except CommandError:
+            dirty = True
+
+        dirty_tracker.store(self.path, head, dirty)
+        return dirty
+
+    async def new_commits(self, current_commit: Optional[str] = None, upstream_commit: Optional[str] = None):
         commits_behind_count = 0
 
         to_ref = f'origin/{self._branch}'
-        current_commit = await self.rev_parse("HEAD")
-        upstream_commit = await self.rev_parse(to_ref)
+        if not current_commit or not upstream_commit:
+            current_commit, upstream_commit = await self._git.resolve(self.path, 'HEAD', to_ref)
+        await self.deepen_until(lambda: self.has_merge_base(current_commit, upstream_commit))
 
         if upstream_commit != "?":
-            rl_args = f"HEAD..{upstream_commit} --count"
-            commits_behind_count = int(await self.rev_list(rl_args))
+            commits_behind_count = await self._git.count(self.path, current_commit, upstream_commit)
 
         # Get Commits Behind
         commits_behind: list[TaggedCommit] = []
@@ -169,42 +517,47 @@ class GitDataSource(DataSource):
 
         return commits_behind
 
-    async def get_tagged_commits(self, count: int = MAX_COMMITS):
-        cnt_arg = f"--count={count} " if count > 0 else ""
-        command = f"git for-each-ref {cnt_arg}--sort='-creatordate' --contains=HEAD --merged=origin/{self._branch} --format={self.GIT_REF_FMT} 'refs/tags'"
-        resp = await shell(command, cwd=self.path, raw_std=True)
-
-        tagged_commits: dict[str, str] = {}
-        for line in resp.split('\n'):
-            parts = line.strip().split()
-            if len(parts) != 3 or parts[0] != "commit":
-                continue
-            sha, ref = parts[1:]
-            tag = ref.split('/')[-1]
-            tagged_commits[sha] = tag
+    async def get_tagged_commits(self) -> dict[str, str]:
+        if not os.path.exists(self._tag_index(self.path)):
+            await self._update_tag_index(self.path)
 
         # Return tagged commits as SHA keys mapped to tag values
-        return tagged_commits
+        return json.loads(readfile(self._tag_index(self.path)))
 
     async def get_commits_behind(self, current_commit: str, to_ref: str, paths: list[str] = None):
-        command = f"git log {current_commit}..{to_ref} --format={self.GIT_LOG_FMT} --max-count={self.MAX_COMMITS}"
-        if paths:
-            command = f'{command} -- {" ".join(paths)}'
-
-        resp = await shell(command, cwd=self.path, raw_std=True)
-        commits_behind: list[Commit] = []
-        for log_entry in resp.split('\x1E'):
-            log_entry = log_entry.strip()
-            if not log_entry:
-                continue
-            log_items = [li.strip() for li in log_entry.split('\x1D')
-                         if li.strip()]
-            cbh = [li.split(':', 1) for li in log_items]
-            commits_behind.append(Commit(**dict(cbh)))
-        return commits_behind
+        commits = await self._git.log(self.path, current_commit, to_ref, self.MAX_COMMITS, paths=paths)
+        return [Commit(**commit) for commit in commits]
+
+    async def is_shallow(self) -> bool:
+        return await self.rev_parse('--is-shallow-repository') == 'true'
+
+    async def has_commit(self, ref: str) -> bool:
+        try:
+            await shell(f'git cat-file -e {ref}^{{commit}}', cwd=self.path)
+            return True
+        except CommandError:
+            return False
+
+    async def has_merge_base(self, first: str, second: str) -> bool:
+        try:
+            await shell(f'git merge-base {first} {second}', cwd=self.path)
+            return True
+        except CommandError:
+            return False
+
+    async def deepen_until(self, available: Callable[[], Awaitable[bool]]) -> None:
+        # shallow clones are extended step by step, full history is only fetched as a last resort
+        deepen = self.MAX_COMMITS
+        while not await available():
+            if not await self.is_shallow():
+                return
+
+            if deepen > self.MAX_DEEPEN:
+                await shell('git fetch --unshallow origin', cwd=self.path)
+                return
+
+            await shell(f'git fetch --deepen={deepen} origin', cwd=self.path)
+            deepen = deepen * 2
 
     async def rev_parse(self, args: str = ""):
         return await shell(f"git rev-parse {args}".strip(), cwd=self.path, strip=True)
-
-    async def rev_list(self, args: str = ""):
-        return await shell(f"git rev-list {args}".strip(), cwd=self.path, strip=True)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from abc import abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Type, TypeVar
+
+from ...adapter.command import shell
+
+try:
+    import pygit2
+    from pygit2.enums import DescribeStrategy, SortMode
+except ImportError:
+    # missing or too old for typed enums, the cli backend is used
+    pygit2 = None  # type: ignore
+
+T = TypeVar('T')
+
+AVAILABLE_GIT_BACKENDS: dict[str, Type[GitBackend]] = {}
+_instances: dict[str, GitBackend] = {}
+
+
+def git_backend(name):
+    def register_function_fn(cls):
+        if name in AVAILABLE_GIT_BACKENDS:
+            raise ValueError(f'Name {name} already registered!')
+        if not issubclass(cls, GitBackend):
+            raise ValueError(f'Class {cls} is not a subclass of {GitBackend}')
+        AVAILABLE_GIT_BACKENDS[name] = cls
+        return cls
+
+    return register_function_fn
+
+
+class GitBackend:
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    @abstractmethod
+    async def resolve(self, repo: str, *refs: str) -> list[str]:
+        pass
+
+    @abstractmethod
+    async def describe(self, repo: str, ref: str) -> str:
+        pass
+
+    @abstractmethod
+    async def count(self, repo: str, since: str, to: str) -> int:
+        pass
+
+    @abstractmethod
+    async def log(self, repo: str, since: str, to: str, max_count: int, paths: Optional[list[str]] = None) -> list[dict]:
+        pass
+
+
+@git_backend('cli')
+class CliGitBackend(GitBackend):
+    GIT_LOG_FMT = (
+        "\"sha:%H%x1Dauthor:%an%x1Ddate:%ct%x1Dsubject:%s%x1Dmessage:%b%x1E\""
+    )
+
+    async def resolve(self, repo: str, *refs: str) -> list[str]:
+        return (await shell(f"git rev-parse {' '.join(refs)}", cwd=repo, strip=True)).split('\n')
+
+    async def describe(self, repo: str, ref: str) -> str:
+        return await shell(f'git describe --always --tags --long --abbrev=8 {ref}', cwd=repo, strip=True)
+
+    async def count(self, repo: str, since: str, to: str) -> int:
+        return int(await shell(f'git rev-list {since}..{to} --count', cwd=repo, strip=True))
+
+    async def log(self, repo: str, since: str, to: str, max_count: int, paths: Optional[list[str]] = None) -> list[dict]:
+        command = f"git log {since}..{to} --format={self.GIT_LOG_FMT} --max-count={max_count}"
+        if paths:
+            command = f'{command} -- {" ".join(paths)}'
+
+        resp = await shell(command, cwd=repo, raw_std=True)
+        commits: list[dict] = []
+        for log_entry in resp.split('\x1E'):
+            log_entry = log_entry.strip()
+            if not log_entry:
+                continue
+            log_items = [li.strip() for li in log_entry.split('\x1D')
+                         if li.strip()]
+            commits.append(dict(li.split(':', 1) for li in log_items))
+        return commits
+
+
+@git_backend('pygit2')
+class Pygit2GitBackend(GitBackend):
+    def __init__(self) -> None:
+        self._repos: dict[str, pygit2.Repository] = {}
+        self._cli = CliGitBackend()
+        # libgit2 calls block, they run on a worker which also keeps the cached repositories on a single thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qbe-pygit2')
+
+    @classmethod
+    def available(cls) -> bool:
+        return pygit2 is not None
+
+    def _repo(self, repo: str) -> pygit2.Repository:
+        if repo not in self._repos:
+            self._repos[repo] = pygit2.Repository(repo)
+        return self._repos[repo]
+
+    def _commit(self, repo: str, ref: str) -> pygit2.Commit:
+        return self._repo(repo).revparse_single(ref).peel(pygit2.Commit)
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+
+    # anything libgit2 cannot answer (e.g. shallow or broken repositories) is asked of git itself
+
+    async def resolve(self, repo: str, *refs: str) -> list[str]:
+        try:
+            return await self._run(self._resolve, repo, refs)
+        except (pygit2.GitError, KeyError, ValueError):
+            return await self._cli.resolve(repo, *refs)
+
+    async def describe(self, repo: str, ref: str) -> str:
+        try:
+            return await self._run(self._describe, repo, ref)
+        except (pygit2.GitError, ValueError):
+            return await self._cli.describe(repo, ref)
+
+    async def count(self, repo: str, since: str, to: str) -> int:
+        try:
+            return await self._run(self._count, repo, since, to)
+        except (pygit2.GitError, KeyError, ValueError):
+            return await self._cli.count(repo, since, to)
+
+    async def log(self, repo: str, since: str, to: str, max_count: int, paths: Optional[list[str]] = None) -> list[dict]:
+        if paths:
+            return await self._cli.log(repo, since, to, max_count, paths)
+
+        try:
+            return await self._run(self._log, repo, since, to, max_count)
+        except (pygit2.GitError, KeyError, ValueError):
+            return await self._cli.log(repo, since, to, max_count, paths)
+
+    def _resolve(self, repo: str, refs: tuple[str, ...]) -> list[str]:
+        return [str(self._commit(repo, ref).id) for ref in refs]
+
+    def _describe(self, repo: str, ref: str) -> str:
+        try:
+            return self._repo(repo).describe(
+                committish=ref, describe_strategy=DescribeStrategy.TAGS,
+                abbreviated_size=8, always_use_long_format=True
+            )
+        except KeyError:
+            return str(self._commit(repo, ref).id)[:8]
+
+    def _count(self, repo: str, since: str, to: str) -> int:
+        walker = self._repo(repo).walk(self._commit(repo, to).id, SortMode.NONE)
+        walker.hide(self._commit(repo, since).id)
+        return sum(1 for _ in walker)
+
+    def _log(self, repo: str, since: str, to: str, max_count: int) -> list[dict]:
+        walker = self._repo(repo).walk(self._commit(repo, to).id, SortMode.TIME)
+        walker.hide(self._commit(repo, since).id)
+
+        commits: list[dict] = []
+        for commit in walker:
+            if len(commits) >= max_count:
+                break
+
+            subject, _, body = commit.message.partition('\n\n')
+            commits.append({
+                'sha': str(commit.id),
+                'author': commit.author.name,
+                'date': str(commit.commit_time),
+                'subject': ' '.join(subject.split('\n')).strip(),
+                'message': body.strip()
+            })
+        return commits
+
+
+def backend(name: str) -> GitBackend:
+    cls = AVAILABLE_GIT_BACKENDS.get(name)
+    if cls is None or not cls.available():
+        name, cls = 'cli', CliGitBackend
+
+    if name not in _instances:
+        _instances[name] = cls()
+    return _instances[name]
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+import os
+import time
+from typing import Callable
+
+from .git import GitDataSource
+from ...adapter.command import shell
+from ...adapter.dataclass import encode, UniversalDecoder
+from ...adapter.file import readfile, writefile
+from ...paths import paths
+
+
+@dataclass
+class RepoReport(UniversalDecoder):
+    repo: str
+    size_before: int
+    size_after: int
+    duration: float
+    time: float
+
+
+class GitMaintenance:
+    MAX_PACKS = 20
+
+    @property
+    def report_path(self) -> str:
+        return os.path.join(paths.cache, 'maintenance.json')
+
+    @property
+    def repositories(self) -> list[str]:
+        repos: list[str] = []
+        if os.path.isdir(paths.packages):
+            repos.extend(
+                entry.path for entry in sorted(os.scandir(paths.packages), key=lambda e: e.name)
+                if os.path.isdir(os.path.join(entry.path, '.git'))
+            )
+        if os.path.isdir(paths.git_store):
+            repos.extend(
+                entry.path for entry in sorted(os.scandir(paths.git_store), key=lambda e: e.name)
+                if entry.name.endswith('.git')
+            )
+        return repos
+
+    def report(self) -> dict[str, RepoReport]:
+        if not os.path.exists(self.report_path):
+            return {}
+        return {repo: RepoReport.decode(data) for repo, data in json.loads(readfile(self.report_path)).items()}
+
+    async def run(self, should_continue: Callable[[], bool] = lambda: True) -> list[RepoReport]:
+        reports = self.report()
+        done = []
+        for repo in self.repositories:
+            if not should_continue():
+                break
+
+            reports[repo] = await self.maintain(repo)
+            done.append(reports[repo])
+
+        if os.access(paths.cache, os.W_OK):
+            writefile(self.report_path, json.dumps(encode(reports), indent=2))
+        return done
+
+    async def maintain(self, repo: str) -> RepoReport:
+        start = time.time()
+        size_before = await GitDataSource.objects_size(repo)
+        # store mirrors never lose objects, clones may still borrow unreachable ones from them
+        mirror = repo.startswith(paths.git_store)
+
+        # loose objects go into a new pack, objects borrowed from the git store are left out
+        await shell('git repack -d -l -q', cwd=repo)
+        if (await GitDataSource.objects_stats(repo)).get('packs', 0) > self.MAX_PACKS:
+            await shell(f'git repack -a -d -l -q{" -k" if mirror else ""}', cwd=repo)
+        await shell('git prune-packed -q', cwd=repo)
+
+        if not mirror:
+            await shell('git prune --expire=2.weeks.ago', cwd=repo)
+            await GitDataSource.enable_untracked_cache(repo)
+
+        if await shell('git rev-parse --is-shallow-repository', cwd=repo, strip=True) != 'true':
+            await shell('git commit-graph write --reachable --split --changed-paths', cwd=repo)
+
+        return RepoReport(
+            repo=repo,
+            size_before=size_before,
+            size_after=await GitDataSource.objects_size(repo),
+            duration=time.time() - start,
+            time=time.time()
+        )
+
+
+git_maintenance = GitMaintenance()
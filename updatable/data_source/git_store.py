@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Callable, Optional
+
+from ...adapter.command import shell, CommandError
+from ...adapter.file import readfile, writefile
+from ...paths import paths
+
+
+class GitStore:
+    FETCH_TTL = 60
+
+    def __init__(self) -> None:
+        self._fetching: dict[str, asyncio.Future] = {}
+        self._fetched: dict[str, float] = {}
+
+    @property
+    def available(self) -> bool:
+        return os.access(paths.cache, os.W_OK)
+
+    @staticmethod
+    def _normalize(url: str) -> str:
+        return url.rstrip('/').removesuffix('.git')
+
+    def mirror(self, url: str) -> str:
+        digest = hashlib.sha1(self._normalize(url).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(paths.git_store, f'{digest}.git')
+
+    async def fetch(
+            self, url: str, branch: Optional[str] = None,
+            stdout_callback: Optional[Callable[[str], None]] = None, tip: Optional[str] = None
+    ) -> None:
+        key = self._normalize(url) + (f'#{branch}' if branch else '')
+        # a tip the caller has seen upstream is fetched unless the mirror already has it, however recent the last fetch
+        if time.time() - self._fetched.get(key, 0) < self.FETCH_TTL and (tip is None or await self.has_commit(url, tip)):
+            return
+
+        # concurrent refreshes of the same upstream share a single network fetch
+        if key not in self._fetching:
+            self._fetching[key] = asyncio.ensure_future(self._fetch(url, branch, stdout_callback))
+
+        try:
+            await asyncio.shield(self._fetching[key])
+            self._fetched[key] = time.time()
+        finally:
+            self._fetching.pop(key, None)
+
+    async def _fetch(self, url: str, branch: Optional[str], stdout_callback: Optional[Callable[[str], None]]) -> None:
+        mirror = self.mirror(url)
+        if not os.path.exists(mirror):
+            os.makedirs(mirror)
+            await shell('git init --bare', cwd=mirror)
+            await shell(f'git config remote.origin.url {url}', cwd=mirror)
+            await shell("git config --add remote.origin.fetch '+refs/heads/*:refs/heads/*'", cwd=mirror)
+            await shell("git config --add remote.origin.fetch '+refs/tags/*:refs/tags/*'", cwd=mirror)
+            # working clones borrow objects from here, so nothing unreachable may ever be dropped
+            await shell('git config gc.pruneExpire never', cwd=mirror)
+
+        refspec = f" '+refs/heads/{branch}:refs/heads/{branch}'" if branch else ''
+        await shell(f'git fetch --prune --progress origin{refspec}', cwd=mirror, stderr_callback=stdout_callback)
+
+    async def has_commit(self, url: str, ref: str) -> bool:
+        try:
+            await shell(f'git cat-file -e {ref}^{{commit}}', cwd=self.mirror(url))
+            return True
+        except CommandError:
+            return False
+
+    def attach(self, repo: str, url: str) -> None:
+        objects = os.path.join(self.mirror(url), 'objects')
+        alternates = os.path.join(repo, '.git', 'objects', 'info', 'alternates')
+
+        current = readfile(alternates).split('\n') if os.path.exists(alternates) else []
+        if objects in current:
+            return
+
+        os.makedirs(os.path.dirname(alternates), exist_ok=True)
+        writefile(alternates, '\n'.join([*filter(None, current), objects]) + '\n')
+
+
+git_store = GitStore()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from ...adapter.fetch import get_cached, request, FetchError
+from ...settings import settings
+
+
+class GitHubReleases:
+    TTL = 60
+    BATCH_SIZE = 50
+
+    def __init__(self) -> None:
+        self._repos: set[str] = set()
+        self._latest: dict[str, tuple[float, Optional[str]]] = {}
+        self._batch: Optional[asyncio.Future] = None
+
+    @property
+    def api(self) -> str:
+        return settings.github_api.rstrip('/')
+
+    @property
+    def token(self) -> Optional[str]:
+        return settings.github_token or os.environ.get('GITHUB_TOKEN')
+
+    @property
+    def _headers(self) -> dict[str, str]:
+        headers = {'Accept': 'application/vnd.github.v3+json'}
+        if token := self.token:
+            headers['Authorization'] = f'bearer {token}'
+        return headers
+
+    def register(self, repo: str) -> None:
+        self._repos.add(repo)
+
+    def _fresh(self, repo: str) -> bool:
+        return repo in self._latest and time.time() - self._latest[repo][0] < self.TTL
+
+    async def latest(self, repo: str) -> Optional[str]:
+        self.register(repo)
+        if not self._fresh(repo) and self.token:
+            # the first lookup of a refresh run resolves every registered repository at once
+            try:
+                await self._batched()
+            except FetchError as e:
+                logging.warning(f'Batched release lookup failed, falling back to REST: {e}')
+
+        if self._fresh(repo):
+            return self._latest[repo][1]
+
+        return await self._rest_latest(repo)
+
+    async def _batched(self) -> None:
+        if self._batch is None or self._batch.done():
+            self._batch = asyncio.ensure_future(self._query(sorted(r for r in self._repos if not self._fresh(r))))
+        await asyncio.shield(self._batch)
+
+    async def _query(self, repos: list[str]) -> None:
+        for offset in range(0, len(repos), self.BATCH_SIZE):
+            batch = repos[offset:offset + self.BATCH_SIZE]
+            fields = []
+            for i, repo in enumerate(batch):
+                owner, name = repo.split('/', maxsplit=1)
+                fields.append(
+                    f'r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ latestRelease {{ name }} }}'
+                )
+
+            resp = await request('POST', f'{self.api}/graphql', json={'query': f'{{ {" ".join(fields)} }}'}, headers=self._headers)
+            data = resp.json().get('data')
+            if data is None:
+                raise FetchError(f'GraphQL query returned no data: {resp.json().get("errors")}')
+
+            now = time.time()
+            for i, repo in enumerate(batch):
+                # missing repositories come back as null together with an error entry
+                release = (data.get(f'r{i}') or {}).get('latestRelease') or {}
+                self._latest[repo] = (now, release.get('name'))
+
+    async def _rest_latest(self, repo: str) -> Optional[str]:
+        resp = await get_cached(f'{self.api}/repos/{repo}/releases/latest', headers=self._headers)
+        version = None
+        if resp.status_code in (200, 304) and resp.content:
+            release = resp.json()
+            if isinstance(release, list) and len(release) > 0:
+                release = release[0]
+
+            if isinstance(release, dict):
+                version = release.get('name', None)
+
+        self._latest[repo] = (time.time(), version)
+        return version
+
+
+github_releases = GitHubReleases()
+
+__all__ = ['github_releases']
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from .base import DataSource
 
@@ -25,5 +25,20 @@ class InternalDataSource(DataSource):
     async def refresh(self, lock: Versioned, **kw) -> None:
         return await self._data_source.refresh(lock, **kw)
 
+    async def prefetch(self, lock: Versioned, **kw) -> int:
+        return await self._data_source.prefetch(lock, **kw)
+
     async def update(self, lock: Versioned, **kw) -> bool:
         return await self._data_source.update(lock, **kw)
+
+    async def upcoming_file(self, path: str) -> Optional[str]:
+        return await self._data_source.upcoming_file(path)
+
+    async def staged_release(self) -> Optional[str]:
+        return await self._data_source.staged_release()
+
+    async def switch_release(self, name: str) -> None:
+        return await self._data_source.switch_release(name)
+
+    async def rollback(self) -> Optional[str]:
+        return await self._data_source.rollback()
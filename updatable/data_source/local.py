@@ -1,17 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
-import tempfile
+import shutil
 import time
 from typing import TYPE_CHECKING, Optional
-import urllib.request
 import zipfile
 
 from . import DataSource
-from ...adapter.fetch import get
-from ...adapter.file import readfile
+from .github import github_releases
+from ...adapter.fetch import download, FetchError
+from ...adapter.file import readfile, replace_dir, writefile
+from ...paths import paths
 
 if TYPE_CHECKING:
     from ...lockfile.versioned import Versioned
@@ -21,6 +24,8 @@ class LocalDataSource(DataSource):
     def __init__(self, path: str, url: Optional[str] = None) -> None:
         super().__init__(path)
         self._url = url
+        if repo := self._repo_url_part(self._load()):
+            github_releases.register(repo)
 
     def _load(self):
         rinfo = os.path.join(self.path, "release_info.json")
@@ -45,46 +50,97 @@ class LocalDataSource(DataSource):
     async def refresh(self, lock: Versioned, **kw) -> None:
         data = self._load()
         lock.current_version = data.get('version', '?')
-        lock.remote_version = await self._get_remote_version(data)
+        lock.remote_version = await self._get_remote_version(data, lock)
         lock.commits_behind = []
         lock.refresh_time = time.time()
 
-    async def update(self, lock: Versioned, **kw) -> bool:
-        if lock.current_version != '?' and lock.remote_version != '?' and lock.remote_version == lock.current_version:
-            return False
-
+    def _release_url(self, lock: Versioned) -> Optional[str]:
         if self._url and self._url.startswith('https://github.com/'):
             data = self._load()
             if repo := self._repo_url_part(data):
                 name = data.get('project_name')
-                url = f'https://github.com/{repo}/releases/download/{lock.remote_version}/{name}.zip'
-                self._extract_zip_file(url, self.path)
-                return True
+                return f'https://github.com/{repo}/releases/download/{lock.remote_version}/{name}.zip'
 
-        return False
+        return None
 
-    async def _get_remote_version(self, data: dict, channel: str = 'stable'):
-        if repo := self._repo_url_part(data):
-            if channel == 'stable':
-                resource = f"repos/{repo}/releases/latest"
-            else:
-                resource = f"repos/{repo}/releases?per_page=1"
+    @property
+    def _staging_dir(self) -> str:
+        return paths.releases(os.path.basename(self.path))
+
+    def _staged_file(self, lock: Versioned) -> str:
+        return os.path.join(self._staging_dir, f'{lock.remote_version}.zip')
+
+    def _remove_superseded(self, staged_file: str) -> None:
+        # a release replaced upstream before its download completed is never resumed
+        for entry in os.scandir(self._staging_dir):
+            if entry.path not in (staged_file, staged_file + '.part'):
+                os.remove(entry.path)
+
+    async def prefetch(self, lock: Versioned, stdout_callback=None, **kw) -> int:
+        if lock.current_version != '?' and lock.remote_version != '?' and lock.remote_version == lock.current_version:
+            return 0
+
+        if os.path.exists(self._staged_file(lock)):
+            return 0
+
+        staged_file = await self._download(lock, stdout_callback)
+        return os.path.getsize(staged_file) if staged_file else 0
+
+    async def _download(self, lock: Versioned, stdout_callback=None) -> Optional[str]:
+        url = self._release_url(lock)
+        if url is None:
+            return None
+
+        if stdout_callback:
+            stdout_callback(f'Downloading {url}...')
+
+        def progress(size: int, total: Optional[int]) -> None:
+            if stdout_callback and total:
+                stdout_callback(f'Downloaded {size * 100 // total}% of {total // 1024} KiB')
+
+        # an interrupted download leaves the .part file behind and continues from there next time
+        staged_file = self._staged_file(lock)
+        os.makedirs(self._staging_dir, exist_ok=True)
+        self._remove_superseded(staged_file)
+        await download(url, staged_file + '.part', progress=progress)
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._verify_zip_file, staged_file + '.part')
+        except Exception:
+            os.remove(staged_file + '.part')
+            raise
+
+        os.rename(staged_file + '.part', staged_file)
+        return staged_file
 
-            headers = {"Accept": "application/vnd.github.v3+json"}
+    async def update(self, lock: Versioned, stdout_callback=None, **kw) -> bool:
+        if lock.current_version != '?' and lock.remote_version != '?' and lock.remote_version == lock.current_version:
+            return False
+
+        staged_file = self._staged_file(lock)
+        if not os.path.exists(staged_file) and not await self._download(lock, stdout_callback):
+            return False
+
+        written, linked = await asyncio.get_event_loop().run_in_executor(None, self._install_zip_file, staged_file)
+        os.remove(staged_file)
+        if stdout_callback:
+            stdout_callback(f'{written} files changed, {linked} unchanged')
+        return True
 
+    async def _get_remote_version(self, data: dict, lock: Versioned):
+        if repo := self._repo_url_part(data):
             try:
-                resp = await get(f'https://api.github.com/{resource}', headers=headers)
+                version = await github_releases.latest(repo)
+                lock.last_error = None
+                if version:
+                    return version
+            except FetchError as e:
+                # the last known version stays, the error is reported on the package
+                logging.warning(f'Failed to check latest release of {repo}: {e}')
+                lock.last_error = str(e)
+                return lock.remote_version
             except Exception:
                 logging.exception("Failed to load release_info.json.")
-            else:
-                if resp.status_code in (200, 304) and resp.content:
-                    release = resp.json()
-
-                    if isinstance(release, list) and len(release) > 0:
-                        release = release[0]
-
-                    if isinstance(release, dict) and (version := release.get('name', None)):
-                        return version
         return '?'
 
     @staticmethod
@@ -94,21 +150,97 @@ class LocalDataSource(DataSource):
         return None
 
     @staticmethod
-    def _extract_zip_file(file_path_or_url: str, output: str):
-        if file_path_or_url.startswith('http'):
-            # Download the zip file from the URL to a temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                urllib.request.urlretrieve(file_path_or_url, tmp_file.name)
-                zip_file_name = tmp_file.name
-        else:
-            # Use the local file path
-            zip_file_name = file_path_or_url
-
-            # Extract the contents of the zip file to the output directory
+    def _verify_zip_file(zip_file_name: str):
         with zipfile.ZipFile(zip_file_name, 'r') as zip_ref:
-            os.makedirs(output, exist_ok=True)
-            zip_ref.extractall(output)
+            if (broken := zip_ref.testzip()) is not None:
+                raise zipfile.BadZipFile(f'CRC check of {broken} failed in {zip_file_name}')
+
+    @property
+    def _zip_manifest_path(self) -> str:
+        return os.path.join(paths.cache, 'zip', hashlib.sha1(self.path.encode('utf-8')).hexdigest()[:16] + '.json')
+
+    def _load_zip_manifest(self) -> dict[str, list[int]]:
+        try:
+            return json.loads(readfile(self._zip_manifest_path))
+        except (OSError, ValueError):
+            return {}
+
+    def _is_installed(self, info: zipfile.ZipInfo, entry: Optional[list[int]]) -> bool:
+        current = os.path.join(self.path, info.filename)
+        if not entry or entry[:2] != [info.CRC, info.file_size]:
+            return False
+        if not os.path.realpath(current).startswith(os.path.realpath(self.path) + os.sep):
+            return False
+
+        # files edited in place since the last install are extracted again
+        try:
+            stat = os.stat(current)
+        except OSError:
+            return False
+        return stat.st_size == info.file_size and stat.st_mtime_ns == entry[2]
+
+    def _carry_local_files(self, staging: str, installed: dict[str, list[int]]) -> None:
+        # only members of the previous release are dropped, files added to the tree (e.g. to a web root) are kept
+        released = {os.path.normpath(name) for name in installed}
+        for root, dirs, files in os.walk(self.path):
+            for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+                source = os.path.join(root, name)
+                entry = os.path.relpath(source, self.path)
+                target = os.path.join(staging, entry)
+                if entry in released or os.path.lexists(target):
+                    continue
+
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    if os.path.islink(source) or not self._link(source, target):
+                        shutil.copy2(source, target, follow_symlinks=False)
+                except OSError:
+                    logging.warning(f'Could not keep {source}, it collides with the new release')
+
+    @staticmethod
+    def _link(source: str, target: str) -> bool:
+        try:
+            os.link(source, target)
+            return True
+        except OSError:
+            return False
 
-            # Delete the temporary file if it was downloaded from a URL
-        if file_path_or_url.startswith('http'):
-            os.remove(zip_file_name)
+    def _install_zip_file(self, zip_file_name: str) -> tuple[int, int]:
+        # extracted next to the live tree, so it can be renamed into place at once,
+        # members unchanged since the last install are hardlinked from the live tree instead of written again
+        staging = self.path.rstrip('/') + '.qbe-new'
+        shutil.rmtree(staging, ignore_errors=True)
+        installed = self._load_zip_manifest()
+        manifest = {}
+        written = linked = 0
+
+        with zipfile.ZipFile(zip_file_name, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    zip_ref.extract(info, staging)
+                    continue
+
+                target = os.path.join(staging, info.filename)
+                if self._is_installed(info, installed.get(info.filename)):
+                    try:
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        os.link(os.path.join(self.path, info.filename), target)
+                        linked = linked + 1
+                    except OSError:
+                        target = zip_ref.extract(info, staging)
+                        written = written + 1
+                else:
+                    target = zip_ref.extract(info, staging)
+                    written = written + 1
+
+                manifest[info.filename] = [info.CRC, info.file_size, os.stat(target).st_mtime_ns]
+
+        if os.path.isdir(self.path):
+            self._carry_local_files(staging, installed)
+        replace_dir(staging, self.path)
+
+        if os.access(paths.cache, os.W_OK):
+            os.makedirs(os.path.dirname(self._zip_manifest_path), exist_ok=True)
+            writefile(self._zip_manifest_path, json.dumps(manifest))
+
+        return written, linked
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import re
 import time
@@ -13,6 +14,9 @@ if TYPE_CHECKING:
 
 
 class MCUDataSource(GitDataSource):
+    _states: dict[str, tuple[str, int]] = {}
+    _queries: dict[tuple, asyncio.Future] = {}
+
     async def refresh(self, lock: Versioned, **kw) -> None:
         if lock.current_version == '?':
             return
@@ -32,13 +36,43 @@ class MCUDataSource(GitDataSource):
 
         lock.refresh_time = time.time()
 
+    async def prefetch(self, lock: Versioned, stdout_callback=None, **kw) -> int:
+        return 0  # klipper sources are fetched by the klipper package
+
     async def update(self, lock: Versioned, **kw) -> bool:
         os.makedirs(paths.firmwares, exist_ok=True)
         return False
 
     async def commits_since(self, since_ref: str, to_ref: str = 'HEAD', paths: Optional[list[str]] = None):
-        rl_args = f"{since_ref}..{to_ref} --count"
-        commits_behind_count = int(await self.rev_list(rl_args))
+        to_commit, = await self._git.resolve(self.path, to_ref)
+        state = (to_commit, self._tag_index_mtime())
+        if self._states.get(self.path) != state:
+            # tree moved or tags were fetched, answers for the previous state are of no use anymore
+            self._states[self.path] = state
+            for key in [key for key in self._queries if key[0] == self.path]:
+                del self._queries[key]
+
+        # MCUs flashed from the same tree ask the same question, it is answered once
+        key = (self.path, since_ref, state, tuple(paths or ()))
+        if key not in self._queries:
+            self._queries[key] = asyncio.ensure_future(self._commits_since(since_ref, to_commit, paths))
+
+        try:
+            return list(await asyncio.shield(self._queries[key]))
+        except Exception:
+            self._queries.pop(key, None)
+            raise
+
+    def _tag_index_mtime(self) -> int:
+        try:
+            return os.stat(self._tag_index(self.path)).st_mtime_ns
+        except OSError:
+            return 0
+
+    async def _commits_since(self, since_ref: str, to_ref: str, paths: Optional[list[str]]):
+        await self.deepen_until(lambda: self.has_commit(since_ref))
+
+        commits_behind_count = await self._git.count(self.path, since_ref, to_ref)
 
         # Get Commits Behind
         commits_behind: list[TaggedCommit] = []
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+import shutil
+from typing import Optional
+
+
+class Releases:
+    """Versioned sibling directories of path, path itself is a symlink to the active one"""
+
+    def __init__(self, path: str) -> None:
+        self._path = path.rstrip('/')
+
+    @property
+    def root(self) -> str:
+        return os.path.join(os.path.dirname(self._path), '.releases', os.path.basename(self._path))
+
+    def release_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    @property
+    def current(self) -> Optional[str]:
+        if not os.path.islink(self._path):
+            return None
+        return os.path.basename(os.readlink(self._path))
+
+    @property
+    def previous(self) -> Optional[str]:
+        link = os.path.join(self.root, '.previous')
+        return os.path.basename(os.readlink(link)) if os.path.islink(link) else None
+
+    def adopt(self, name: str) -> None:
+        # an in-place install becomes the first release, renaming keeps files open by running services valid
+        if os.path.islink(self._path) or not os.path.isdir(self._path):
+            return
+
+        os.makedirs(self.root, exist_ok=True)
+        os.rename(self._path, self.release_path(name))
+        os.symlink(self.release_path(name), self._path)
+
+    def switch(self, name: str) -> None:
+        if (current := self.current) and current != name:
+            self._link(self.release_path(current), os.path.join(self.root, '.previous'))
+        self._link(self.release_path(name), self._path)
+
+    def rollback(self) -> Optional[str]:
+        if not (previous := self.previous) or not os.path.isdir(self.release_path(previous)):
+            return None
+
+        self.switch(previous)
+        return previous
+
+    def remove(self) -> None:
+        if os.path.islink(self._path):
+            os.unlink(self._path)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def prune(self) -> None:
+        # only the active release and the one a rollback returns to are kept
+        keep = {self.current, self.previous}
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.') or entry.name in keep or not entry.is_dir(follow_symlinks=False):
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    @staticmethod
+    def _link(target: str, link: str) -> None:
+        # replacing a symlink with rename is atomic, readers never see it missing
+        tmp = link + '.qbe-new'
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.symlink(target, tmp)
+        os.replace(tmp, link)
+
+
+__all__ = ['Releases']
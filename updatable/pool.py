@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Iterable, Optional
+
+
+class DependencyFailedError(Exception):
+    pass
+
+
+class WorkerPool:
+    def __init__(self, jobs: int = 1):
+        self._semaphore = asyncio.Semaphore(max(jobs, 1))
+        self._keys: dict[str, asyncio.Lock] = {}
+        self._tasks: list[asyncio.Future] = []
+
+    def submit(self, job: Awaitable, key: Optional[str] = None, after: Iterable[asyncio.Future] = ()) -> asyncio.Future:
+        task = asyncio.ensure_future(self._run(job, key, list(after)))
+        self._tasks.append(task)
+        return task
+
+    async def join(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _run(self, job: Awaitable, key: Optional[str], after: list[asyncio.Future]):
+        # dependencies are awaited before taking a slot, so waiting jobs never starve the pool
+        if after:
+            results = await asyncio.gather(*after, return_exceptions=True)
+            if any(isinstance(result, BaseException) for result in results):
+                if asyncio.iscoroutine(job):
+                    job.close()
+                raise DependencyFailedError('Dependency failed')
+
+        # jobs sharing a key (e.g. the same working tree) never run at the same time
+        if key is None:
+            async with self._semaphore:
+                return await job
+
+        if key not in self._keys:
+            self._keys[key] = asyncio.Lock()
+
+        async with self._keys[key]:
+            async with self._semaphore:
+                return await job
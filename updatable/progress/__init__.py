@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import TYPE_CHECKING, Optional
+import asyncio
+from contextlib import asynccontextmanager, AsyncExitStack
+from typing import TYPE_CHECKING, Iterable, Optional
 
 from .formatter import LogFormatter
 from .package_status import PackageStatus
+from .prefetch import PrefetchProgress
 from .provider import ProviderProgress
 from .source import SourcesProgress
 from .updatable import UpdatableProgress
@@ -16,15 +19,18 @@ if TYPE_CHECKING:
 
 
 class ProgressRoot:
-    def __init__(self, lockfile: LockFile, formatter: Optional[LogFormatter] = None):
+    def __init__(self, lockfile: LockFile, formatter: Optional[LogFormatter] = None, autosave: bool = True):
         self._lockfile = lockfile
         self._formatter = formatter or LogFormatter()
+        self._autosave = autosave
         self._triggers: set[tuple[Trigger, Updatable]] = set()
         self._known_updatables: set[str] = set()
+        self._resources: dict[str, asyncio.Lock] = dict()
 
         self._installed = 0
         self._updated = 0
         self._removed = 0
+        self._prefetched = 0
 
     @abstractmethod
     def log(self, message: str) -> None:
@@ -38,6 +44,10 @@ class ProgressRoot:
     def formatter(self) -> LogFormatter:
         return self._formatter
 
+    @property
+    def autosave(self) -> bool:
+        return self._autosave
+
     @property
     def triggers(self) -> set[tuple[Trigger, Updatable]]:
         return self._triggers
@@ -45,9 +55,22 @@ class ProgressRoot:
     def notify(self, trigger: Trigger, updatable: Updatable) -> None:
         self._triggers.add((trigger, updatable))
 
-    def updatable(self, updatable: Updatable) -> UpdatableProgress:
+    def updatable(self, updatable: Updatable, buffered: bool = False) -> UpdatableProgress:
         self._known_updatables.add(updatable.source.path)
-        return UpdatableProgress(self, updatable)
+        return UpdatableProgress(self, updatable, buffered=buffered)
+
+    def prefetching(self, updatable: Updatable) -> PrefetchProgress:
+        return PrefetchProgress(self, updatable)
+
+    @asynccontextmanager
+    async def resources(self, names: Iterable[str]):
+        # always acquired in the same order, so updatables running side by side cannot deadlock
+        async with AsyncExitStack() as stack:
+            for name in sorted(set(names)):
+                if name not in self._resources:
+                    self._resources[name] = asyncio.Lock()
+                await stack.enter_async_context(self._resources[name])
+            yield
 
     def mark_installed(self) -> None:
         self._installed = self._installed + 1
@@ -58,6 +81,13 @@ class ProgressRoot:
     def mark_removed(self) -> None:
         self._removed = self._removed + 1
 
+    def mark_prefetched(self, size: int) -> None:
+        self._prefetched = self._prefetched + size
+
+    @property
+    def stats_prefetched(self) -> int:
+        return self._prefetched
+
     @property
     def stats_installed(self) -> int:
         return self._installed
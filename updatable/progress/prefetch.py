@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ...updatable import Updatable
+    from ...updatable.progress import ProgressRoot
+
+
+class PrefetchProgress:
+    def __init__(self, parent: ProgressRoot, updatable: Updatable) -> None:
+        self._parent = parent
+        self._formatter = parent._formatter
+        self._updatable = updatable
+
+    def __enter__(self) -> PrefetchProgress:
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        pass
+
+    def log(self, message: str) -> None:
+        return self._parent.log(self._formatter.format_updatable(self._updatable) + self._formatter.format_raw_log(message))
+
+    def mark_fetched(self, size: int) -> None:
+        self._parent.mark_prefetched(size)
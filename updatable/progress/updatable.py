@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, Optional
 
 from .package_status import PackageStatus
 from .provider import ProviderProgress
@@ -14,10 +14,11 @@ if TYPE_CHECKING:
 
 
 class UpdatableProgress:
-    def __init__(self, parent: ProgressRoot, updatable: Updatable) -> None:
+    def __init__(self, parent: ProgressRoot, updatable: Updatable, buffered: bool = False) -> None:
         self._parent = parent
         self._formatter = parent._formatter
         self._updatable = updatable
+        self._buffer: Optional[list[str]] = [] if buffered else None
 
     @property
     def installed(self) -> bool:
@@ -36,6 +37,10 @@ class UpdatableProgress:
 
         if self._updatable.lock.status in (PackageStatus.FINISHED, PackageStatus.UNKNOWN):
             self._updatable.lock.status = PackageStatus.STARTED
+
+        # triggers of steps completed before an interruption, those steps are not run again
+        for trigger in self._updatable.lock.triggers:
+            self._parent.notify(trigger, self._updatable)
         return self
 
     def __exit__(self, exc_type, exc_value, exc_tb):
@@ -47,8 +52,13 @@ class UpdatableProgress:
             del self._parent._lockfile.requires[self._updatable.identifier]
         else:
             self._updatable.lock.status = PackageStatus.FINISHED
+            self._updatable.lock.checkpoints = []
+            self._updatable.lock.triggers = []
+
+        if self._parent.autosave:
+            self._parent._lockfile.save()
 
-        self._parent._lockfile.save()
+        self._flush()
 
         if status == PackageStatus.INSTALLING:
             self._parent.mark_installed()
@@ -62,11 +72,30 @@ class UpdatableProgress:
         if _is_toplevel:
             message = self._formatter.format_raw_log(message)
 
-        return self._parent.log(self._formatter.format_updatable(self._updatable) + message)
+        message = self._formatter.format_updatable(self._updatable) + message
+        if self._buffer is not None:
+            self._buffer.append(message)
+            return
+
+        return self._parent.log(message)
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        buffer, self._buffer = self._buffer, []
+        for message in buffer:
+            self._parent.log(message)
 
     def notify(self, trigger: Trigger) -> None:
+        # saved with the next checkpoint, a resumed update still runs it
+        if trigger not in self._updatable.lock.triggers:
+            self._updatable.lock.triggers.append(trigger)
         return self._parent.notify(trigger, self._updatable)
 
+    def resources(self, names: Iterable[str]):
+        return self._parent.resources(names)
+
     def provider(self, provider: Provider) -> ProviderProgress:
         return ProviderProgress(self, provider, self._updatable.lock.provided.by(provider))
 
@@ -82,5 +111,14 @@ class UpdatableProgress:
         if self._updatable.lock.status in (PackageStatus.STARTED, PackageStatus.UPDATING):
             self._updatable.lock.status = PackageStatus.REMOVING
 
+    def reached(self, step: str) -> bool:
+        return step in self._updatable.lock.checkpoints
+
+    def checkpoint(self, step: str) -> None:
+        # saved right away, an interrupted update continues after the last completed step
+        self._updatable.lock.checkpoints.append(step)
+        if self._parent.autosave:
+            self._parent._lockfile.save()
+
     def sources(self, data_source):
         return SourcesProgress(self, data_source)